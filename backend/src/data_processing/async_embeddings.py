@@ -0,0 +1,188 @@
+# rag-pgvector/backend/src/data_processing/async_embeddings.py
+import asyncio
+import logging
+import random
+import time
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from config import *
+from embeddings import count_tokens, get_embedding_provider, iter_batches
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# Remaining quota (fraction of the limit) below which concurrency is not increased
+HEADROOM_THRESHOLD = 0.2
+# Failures the SDK would have retried itself (APITimeoutError is an APIConnectionError); unlike 429s
+# they say nothing about the rate limit, so they do not reduce concurrency
+TRANSIENT_ERRORS = (APIConnectionError, InternalServerError)
+
+class TokenBucket:
+    # Quota state survives across asyncio.run() calls; only the lock is bound to a loop
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _get_lock(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def refund(self, amount):
+        if amount > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class AdaptiveConcurrency:
+    # AIMD: halve the limit on a 429, add one slot after a full window of successes with headroom
+    def __init__(self, initial, maximum, minimum=1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.in_flight = 0
+        self.successes = 0
+        self._condition = None
+        self._loop = None
+
+    def _get_condition(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            # Requests of an earlier asyncio.run() are over; the learned limit is kept
+            self.in_flight = 0
+        return self._condition
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled=False, has_headroom=True):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            if throttled:
+                new_limit = max(self.minimum, self.limit // 2)
+                if new_limit != self.limit:
+                    logger.warning(f"Rate limited: reducing embedding concurrency {self.limit} -> {new_limit}")
+                self.limit = new_limit
+                self.successes = 0
+            elif has_headroom:
+                self.successes += 1
+                if self.successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.successes = 0
+            condition.notify_all()
+
+request_bucket = TokenBucket(EMBEDDING_RPM_LIMIT)
+token_bucket = TokenBucket(EMBEDDING_TPM_LIMIT)
+concurrency = AdaptiveConcurrency(EMBEDDING_INITIAL_CONCURRENCY, EMBEDDING_MAX_CONCURRENCY)
+
+def _has_headroom(headers):
+    for remaining_key, limit_key in (
+        ("x-ratelimit-remaining-requests", "x-ratelimit-limit-requests"),
+        ("x-ratelimit-remaining-tokens", "x-ratelimit-limit-tokens"),
+    ):
+        try:
+            remaining = float(headers[remaining_key])
+            limit = float(headers[limit_key])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if limit > 0 and remaining / limit < HEADROOM_THRESHOLD:
+            return False
+    return True
+
+def _retry_delay(error, attempt):
+    retry_after = None
+    if getattr(error, "response", None) is not None:
+        retry_after = error.response.headers.get("retry-after")
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+async def embed_batch_async(texts):
+    provider = get_embedding_provider()
+    if not provider.rate_limited:
+        results, _ = await provider.embed_async(texts)
+        return results
+
+    estimated_tokens = sum(count_tokens(text) for text in texts)
+
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        await request_bucket.acquire(1)
+        await token_bucket.acquire(estimated_tokens)
+        error = None
+        throttled = False
+        has_headroom = False
+        await concurrency.acquire()
+        try:
+            results, headers = await provider.embed_async(texts)
+            has_headroom = _has_headroom(headers)
+        except RateLimitError as e:
+            error, throttled = e, True
+        except TRANSIENT_ERRORS as e:
+            error = e
+        finally:
+            # Also on any other error and on cancellation (a sibling batch failed): the limiter outlives this call
+            await concurrency.release(throttled=throttled, has_headroom=has_headroom)
+
+        if error is None:
+            # Without tiktoken the estimate is an upper bound; give back what the request did not use
+            token_bucket.refund(estimated_tokens - sum(result["total_tokens"] for result in results))
+            return results
+        if attempt == EMBEDDING_MAX_RETRIES:
+            raise error
+        delay = _retry_delay(error, attempt)
+        if throttled:
+            logger.warning(f"Embedding request throttled (attempt {attempt + 1}), retrying in {delay:.1f}s")
+        else:
+            logger.warning(f"Embedding request failed (attempt {attempt + 1}): {error}; retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+async def create_embeddings_async(texts):
+    results = [None] * len(texts)
+
+    async def run(indices):
+        batch_results = await embed_batch_async([texts[i] for i in indices])
+        for i, result in zip(indices, batch_results):
+            results[i] = result
+
+    batches = list(iter_batches(texts))
+    provider = get_embedding_provider()
+    tasks = [asyncio.ensure_future(run(indices)) for indices in batches]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # One batch failed: stop the others and let them release their concurrency slots before returning
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if hasattr(provider, "close_async"):
+            await provider.close_async()
+    logger.info(f"Created {len(texts)} embeddings in {len(batches)} concurrent requests (concurrency limit: {concurrency.limit})")
+    return results
@@ -0,0 +1,59 @@
+# rag-pgvector/backend/src/data_processing/check_duplicate_references.py
+# Finds near-duplicate rows whose canonical row no longer exists (or has no vector); such rows are invisible to search.
+# Usage: python check_duplicate_references.py [--repair]   (--repair embeds them again as canonical rows)
+import logging
+import sys
+from config import *
+from db_connection import connection, ensure_schema
+from embeddings import create_embeddings
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+DANGLING_QUERY = """
+SELECT r.chunk_id, r.file_name, r.chunk_no, r.text
+FROM document_vectors r
+LEFT JOIN document_vectors c ON c.file_name = r.duplicate_of_file AND c.chunk_no = r.duplicate_of_chunk_no
+WHERE r.duplicate_of_file IS NOT NULL AND c.chunk_vector IS NULL
+ORDER BY r.chunk_id;
+"""
+
+REPAIR_QUERY = """
+UPDATE document_vectors
+SET chunk_vector = %s, model = %s, prompt_tokens = %s, total_tokens = %s,
+    duplicate_of_file = NULL, duplicate_of_chunk_no = NULL
+WHERE chunk_id = %s;
+"""
+
+def find_dangling_references(conn):
+    cursor = conn.cursor()
+    cursor.execute(DANGLING_QUERY)
+    rows = cursor.fetchall()
+    conn.commit()
+    return rows
+
+def repair(conn, rows):
+    cursor = conn.cursor()
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        embeddings = create_embeddings([text for _, _, _, text in batch])
+        cursor.executemany(REPAIR_QUERY, [
+            (embedding['embedding'], embedding['model'], embedding['prompt_tokens'], embedding['total_tokens'], chunk_id)
+            for (chunk_id, _, _, _), embedding in zip(batch, embeddings)
+        ])
+        conn.commit()
+        logger.info(f"Re-embedded {start + len(batch)}/{len(rows)} rows")
+
+if __name__ == "__main__":
+    with connection() as conn:
+        ensure_schema(conn)
+        rows = find_dangling_references(conn)
+        if not rows:
+            logger.info("All near-duplicate rows reference a stored canonical row")
+            sys.exit(0)
+        logger.warning(f"{len(rows)} near-duplicate rows reference a missing canonical row, e.g. "
+                       + ", ".join(f"{file_name}#{chunk_no}" for _, file_name, chunk_no, _ in rows[:5]))
+        if "--repair" in sys.argv[1:]:
+            repair(conn, rows)
+        else:
+            sys.exit(1)
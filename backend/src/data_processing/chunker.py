@@ -0,0 +1,79 @@
+# rag-pgvector/backend/src/data_processing/chunker.py
+from collections import deque, namedtuple
+from config import *
+
+Chunk = namedtuple("Chunk", ["text", "page_start", "page_end"])
+
+class Chunker:
+    # Same split/merge rules as langchain's CharacterTextSplitter (literal separator, length = len,
+    # stripped output), built once and run over a stream of pages.
+    # With merge_pages the window is carried into the next page instead of being flushed, so the
+    # tail of one page is merged with the head of the next; each chunk keeps its page span.
+    def __init__(self, chunk_size=None, chunk_overlap=None, separator=None, merge_pages=None):
+        self.chunk_size = CHUNK_SIZE if chunk_size is None else chunk_size
+        self.chunk_overlap = CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+        self.separator = SEPARATOR if separator is None else separator
+        self.merge_pages = CHUNK_MERGE_PAGES if merge_pages is None else merge_pages
+        if self.chunk_size <= 0:
+            raise ValueError(f"CHUNK_SIZE must be > 0, got {self.chunk_size}")
+        if not 0 <= self.chunk_overlap <= self.chunk_size:
+            raise ValueError(f"CHUNK_OVERLAP must be between 0 and CHUNK_SIZE ({self.chunk_size}), got {self.chunk_overlap}")
+
+    def _splits(self, text):
+        parts = text.split(self.separator) if self.separator else list(text)
+        return [part for part in parts if part]
+
+    def _chunk(self, window):
+        text = self.separator.join(split for split, _ in window).strip()
+        if text:
+            return Chunk(text, window[0][1], window[-1][1])
+        return None
+
+    def iter_chunks(self, pages):
+        separator_len = len(self.separator)
+        window = deque()  # (split, page_num)
+        total = 0
+        last_page = None
+
+        for page in pages:
+            page_num = page["metadata"]["page"]
+            # Never merge across a gap (e.g. pages skipped by a page filter)
+            if window and not (self.merge_pages and page_num == last_page + 1):
+                chunk = self._chunk(window)
+                if chunk:
+                    yield chunk
+                window.clear()
+                total = 0
+            last_page = page_num
+
+            for split in self._splits(page["page_content"]):
+                split_len = len(split)
+                if window and total + split_len + separator_len > self.chunk_size:
+                    chunk = self._chunk(window)
+                    if chunk:
+                        yield chunk
+                    # Keep the overlap: drop from the front until it fits
+                    while total > self.chunk_overlap or (
+                        total > 0 and total + split_len + (separator_len if window else 0) > self.chunk_size
+                    ):
+                        total -= len(window[0][0]) + (separator_len if len(window) > 1 else 0)
+                        window.popleft()
+                window.append((split, page_num))
+                total += split_len + (separator_len if len(window) > 1 else 0)
+
+        if window:
+            chunk = self._chunk(window)
+            if chunk:
+                yield chunk
+
+    def split_text(self, text):
+        chunks = [chunk.text for chunk in self.iter_chunks([{"page_content": text, "metadata": {"page": 0}}])]
+        return chunks if chunks else [text]
+
+_chunker = None
+
+def get_chunker():
+    global _chunker
+    if _chunker is None:
+        _chunker = Chunker()
+    return _chunker
@@ -1,122 +1,121 @@
 # rag-pgvector/backend/src/data_processing/csv_to_pgvector.py
 import os
+import time
+import numpy as np
 import pandas as pd
-import psycopg2
 from psycopg2.extras import execute_batch
 from config import *
+from pgvector_schema import INSERT_QUERY
+from pgvector_copy import copy_upsert_rows
+from embeddings import chunk_content_hash
+from embedding_parquet import iter_parquet_rows
+from ingest_pipeline import prefetch
+from db_connection import connection, ensure_schema
+from index_build import finish_bulk_load, prepare_bulk_load
+from parallel_load import load_files
 import logging
-from contextlib import contextmanager
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
-@contextmanager
-def get_db_connection():
-    conn = None
-    try:
-        conn = psycopg2.connect(
-            dbname=PGVECTOR_DB_NAME,
-            user=PGVECTOR_DB_USER,
-            password=PGVECTOR_DB_PASSWORD,
-            host=PGVECTOR_DB_HOST,
-            port=PGVECTOR_DB_PORT
-        )
-        logger.info(f"Connected to database: {PGVECTOR_DB_HOST}:{PGVECTOR_DB_PORT}")
-        yield conn
-    except (KeyError, psycopg2.Error) as e:
-        logger.error(f"Database connection error: {e}")
-        raise
-    finally:
-        if conn is not None:
-            conn.close()
-            logger.info("Database connection closed")
+def insert_batch(cursor, data):
+    if BULK_LOAD_METHOD == "copy":
+        copy_upsert_rows(cursor, data)
+    else:
+        execute_batch(cursor, INSERT_QUERY, data, page_size=BATCH_SIZE)
 
-def create_table_and_index(cursor):
-    create_table_query = f"""
-    CREATE TABLE IF NOT EXISTS document_vectors (
-        chunk_id SERIAL PRIMARY KEY,
-        file_name TEXT,
-        document_page SMALLINT,
-        chunk_no INTEGER,
-        text TEXT,
-        model TEXT,
-        prompt_tokens INTEGER,
-        total_tokens INTEGER,
-        created_date_time TIMESTAMPTZ,
-        chunk_vector vector(3072)
-    );
-    """
-    cursor.execute(create_table_query)
-    logger.info("Table created successfully")
+def parse_vector_column(values):
+    # One numpy parse per chunk instead of one per row: '[a,b,...]' strings are joined and parsed together.
+    # Returns (vectors, element counts); rows without EMBEDDING_DIMENSIONS elements get None
+    texts = values.fillna('').astype(str).str.strip().str.strip('[]')
+    counts = np.where(texts.str.len() > 0, texts.str.count(',') + 1, 0)
+    complete = counts == EMBEDDING_DIMENSIONS
+    flat = np.fromstring(','.join(texts[complete]), dtype=np.float32, sep=',')
+    parsed = iter(flat.reshape(-1, EMBEDDING_DIMENSIONS))
+    return [next(parsed) if ok else None for ok in complete], counts
 
-    if INDEX_TYPE == "hnsw":
-        create_index_query = f"""
-        CREATE INDEX IF NOT EXISTS hnsw_document_vectors_chunk_vector_idx ON document_vectors
-        USING hnsw ((chunk_vector::halfvec(3072)) halfvec_ip_ops)
-        WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});
-        """
-        cursor.execute(create_index_query)
-        logger.info("HNSW index created successfully")
-    elif INDEX_TYPE == "ivfflat":
-        create_index_query = f"""
-        CREATE INDEX IF NOT EXISTS ivfflat_document_vectors_chunk_vector_idx ON document_vectors
-        USING ivfflat ((chunk_vector::halfvec(3072)) halfvec_ip_ops)
-        WITH (lists = {IVFFLAT_LISTS});
-        """
-        cursor.execute(create_index_query)
-        logger.info("IVFFlat index created successfully")
-    elif INDEX_TYPE == "none":
-        logger.info("No index created as per configuration")
-    else:
-        raise ValueError(f"Unsupported index type: {INDEX_TYPE}")
+def nullable(values):
+    return [None if pd.isna(value) else value for value in values.tolist()]
 
-def process_csv_file(file_path, conn):
-    logger.info(f"Processing CSV file: {file_path}")
-    df = pd.read_csv(file_path)
+def iter_csv_rows(file_path):
+    # CSVs written before the Parquet handoff, read BATCH_SIZE rows at a time
+    for chunk in pd.read_csv(file_path, chunksize=BATCH_SIZE):
+        size = len(chunk)
+        empty = pd.Series([None] * size, index=chunk.index, dtype=object)
+        # Near-duplicate rows have no vector of their own
+        duplicate_of_file = chunk.get('duplicate_of_file', empty)
+        is_duplicate = duplicate_of_file.notna().to_numpy()
+        vectors, counts = parse_vector_column(chunk['chunk_vector'])
+        vectors = [None if duplicate else vector for vector, duplicate in zip(vectors, is_duplicate)]
 
-    with conn.cursor() as cursor:
-        create_table_and_index(cursor)
+        keep = is_duplicate | (counts == EMBEDDING_DIMENSIONS)
+        if not keep.all():
+            for count in counts[~keep]:
+                logger.warning(f"Incorrect vector dimension for row. Expected {EMBEDDING_DIMENSIONS}, got {count}. Skipping.")
 
-        insert_query = """
-        INSERT INTO document_vectors
-        (file_name, document_page, chunk_no, text, model, prompt_tokens, total_tokens, created_date_time, chunk_vector)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::vector(3072));
-        """
+        # CSVs written before content hashes were added get one from the current model
+        content_hashes = nullable(chunk.get('content_hash', empty))
+        texts = chunk['text'].tolist()
+        content_hashes = [value or chunk_content_hash(text) for value, text in zip(content_hashes, texts)]
 
-        data = []
-        for _, row in df.iterrows():
-            embedding = row['chunk_vector']
-            if isinstance(embedding, str):
-                embedding = eval(embedding)
-            if len(embedding) != 3072:
-                logger.warning(f"Incorrect vector dimension for row. Expected 3072, got {len(embedding)}. Skipping.")
-                continue
+        document_page = chunk['document_page'].astype('int64')
+        # CSVs written before page spans were stored: single-page chunks
+        document_page_end = chunk.get('document_page_end', document_page).fillna(document_page).astype('int64')
+
+        columns = [
+            chunk['file_name'].tolist(),
+            document_page.tolist(),
+            chunk['chunk_no'].astype('int64').tolist(),
+            texts,
+            nullable(chunk['model']),
+            chunk['prompt_tokens'].astype('int64').tolist(),
+            chunk['total_tokens'].astype('int64').tolist(),
+            chunk['created_date_time'].tolist(),
+            vectors,
+            nullable(duplicate_of_file),
+            [None if pd.isna(value) else int(value) for value in chunk.get('duplicate_of_chunk_no', empty).tolist()],
+            content_hashes,
+            document_page_end.tolist(),
+        ]
+        yield [row for row, ok in zip(zip(*columns), keep) if ok]
 
-            data.append((
-                row['file_name'], row['document_page'], row['chunk_no'], row['text'],
-                row['model'], row['prompt_tokens'], row['total_tokens'], row['created_date_time'],
-                embedding
-            ))
+def process_csv_file(file_path, conn):
+    logger.info(f"Processing file: {file_path}")
+    rows = iter_parquet_rows(file_path) if file_path.endswith('.parquet') else iter_csv_rows(file_path)
 
-        try:
-            execute_batch(cursor, insert_query, data, page_size=BATCH_SIZE)
-            conn.commit()
-            logger.info(f"Inserted {len(data)} rows into the database")
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Error inserting batch: {e}")
+    ensure_schema(conn)
+    inserted = 0
+    start = time.perf_counter()
+    with conn.cursor() as cursor:
+        # The next batch is read and parsed on a background thread while this one is written.
+        # One transaction per batch; a re-run upserts over the batches already committed
+        for data in prefetch(rows):
+            try:
+                insert_batch(cursor, data)
+                conn.commit()
+                inserted += len(data)
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error inserting batch: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            logger.info(f"{os.path.basename(file_path)}: {inserted} rows inserted ({inserted / elapsed:.0f} rows/s)")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Inserted {inserted} rows into the database in {elapsed:.1f}s ({inserted / elapsed if elapsed else 0:.0f} rows/s)")
+    return inserted
 
 def process_csv_files():
     try:
-        with get_db_connection() as conn:
-            for file_name in os.listdir(CSV_OUTPUT_DIR):
-                if file_name.endswith('.csv'):
-                    csv_file_path = os.path.join(CSV_OUTPUT_DIR, file_name)
-                    try:
-                        process_csv_file(csv_file_path, conn)
-                    except Exception as e:
-                        logger.error(f"Error processing {file_name}: {e}")
-            logger.info(f"CSV files have been processed and inserted into the database with {INDEX_TYPE.upper()} index.")
+        with connection() as conn:
+            ensure_schema(conn)
+            prepare_bulk_load(conn)
+            file_paths = [
+                os.path.join(CSV_OUTPUT_DIR, file_name) for file_name in os.listdir(CSV_OUTPUT_DIR)
+                if file_name.endswith(('.parquet', '.csv'))
+            ]
+            load_files(file_paths, process_csv_file)
+            finish_bulk_load(conn)
+            logger.info(f"Vectorized files have been processed and inserted into the database with {INDEX_TYPE.upper()} index.")
     except Exception as e:
         logger.error(f"An error occurred during processing: {e}")
 
@@ -0,0 +1,189 @@
+# rag-pgvector/backend/src/data_processing/db_connection.py
+import atexit
+import logging
+import queue
+import time
+from contextlib import contextmanager
+from config import *
+from pgvector_schema import create_table_and_index
+from vector_adapters import register_pg8000_adapters, register_psycopg2_adapters
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# Schema bootstrap functions that already ran in this process
+_bootstrapped = set()
+# Idle (connection, last used) pairs for pooled_connection(), most recently used on top
+_pool = queue.LifoQueue()
+
+def connect():
+    # New, unmanaged connection
+    if DB_DRIVER == "psycopg2":
+        import psycopg2
+        return psycopg2.connect(
+            dbname=PGVECTOR_DB_NAME,
+            user=PGVECTOR_DB_USER,
+            password=PGVECTOR_DB_PASSWORD,
+            host=PGVECTOR_DB_HOST,
+            port=PGVECTOR_DB_PORT,
+            connect_timeout=DB_CONNECT_TIMEOUT
+        )
+    if DB_DRIVER == "pg8000":
+        # pg8000's timeout applies to every socket read (and so to index builds), not just the connect
+        import pg8000
+        return pg8000.connect(
+            database=PGVECTOR_DB_NAME,
+            user=PGVECTOR_DB_USER,
+            password=PGVECTOR_DB_PASSWORD,
+            host=PGVECTOR_DB_HOST,
+            port=PGVECTOR_DB_PORT
+        )
+    raise ValueError(f"Unsupported database driver: {DB_DRIVER}")
+
+def register_adapters(conn):
+    if DB_DRIVER == "psycopg2":
+        register_psycopg2_adapters(conn)
+    else:
+        register_pg8000_adapters(conn)
+    conn.commit()
+
+def is_alive(conn):
+    if getattr(conn, "closed", 0):  # psycopg2 marks connections it knows are gone
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1;")
+        cursor.fetchone()
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+def close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+class ManagedConnection:
+    # A connection kept for the life of the process, so warm Lambda invocations reuse it. setup(conn) runs
+    # on every new connection (adapters, CREATE TABLE IF NOT EXISTS)
+    def __init__(self, name, setup=None):
+        self.name = name
+        self.setup = setup
+        self.conn = None
+        self.last_used = 0.0
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.conn.close()
+            logger.info(f"{self.name} connection closed")
+        except Exception:
+            pass
+        self.conn = None
+
+    def get(self):
+        # The idle check skips the SELECT 1 round trip between files of one run, but catches
+        # connections dropped while a Lambda container was frozen
+        if self.conn is not None:
+            idle = time.monotonic() - self.last_used
+            if getattr(self.conn, "closed", 0) or (idle >= DB_LIVENESS_CHECK_SECONDS and not is_alive(self.conn)):
+                logger.warning(f"{self.name} connection is no longer usable, reconnecting")
+                self.close()
+        if self.conn is None:
+            try:
+                self.conn = connect()
+                if self.setup is not None:
+                    self.setup(self.conn)
+            except Exception as e:
+                logger.error(f"{self.name} connection error: {e}")
+                self.close()
+                raise
+            logger.info(f"{self.name} connected: {PGVECTOR_DB_HOST}:{PGVECTOR_DB_PORT}")
+        self.last_used = time.monotonic()
+        return self.conn
+
+    @contextmanager
+    def connection(self):
+        # A failed transaction is rolled back so the next caller starts clean, and a connection
+        # that cannot even roll back is dropped
+        conn = self.get()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                self.close()
+            raise
+        finally:
+            self.last_used = time.monotonic()
+
+# One connection per process: files in a batch run and warm Lambda invocations share it
+_shared = ManagedConnection("Database", register_adapters)
+
+def close_connection():
+    _shared.close()
+
+def get_connection():
+    return _shared.get()
+
+def connection():
+    # Borrow the process-wide connection; it stays open afterwards
+    return _shared.connection()
+
+@contextmanager
+def pooled_connection():
+    # For callers that run concurrently (e.g. search requests on several threads): each borrows its own
+    # connection, so a query never pays for a connect. Up to DB_POOL_SIZE idle connections are kept
+    try:
+        conn, last_used = _pool.get_nowait()
+        if getattr(conn, "closed", 0) or (time.monotonic() - last_used >= DB_LIVENESS_CHECK_SECONDS and not is_alive(conn)):
+            close_quietly(conn)
+            conn = None
+    except queue.Empty:
+        conn = None
+    if conn is None:
+        conn = connect()
+        try:
+            register_adapters(conn)
+        except Exception:
+            close_quietly(conn)
+            raise
+    try:
+        yield conn
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            close_quietly(conn)
+            conn = None
+        raise
+    finally:
+        if conn is not None:
+            if _pool.qsize() < DB_POOL_SIZE:
+                _pool.put((conn, time.monotonic()))
+            else:
+                close_quietly(conn)
+
+def close_pool():
+    while True:
+        try:
+            conn, _ = _pool.get_nowait()
+        except queue.Empty:
+            return
+        close_quietly(conn)
+
+def ensure_schema(conn, bootstrap=create_table_and_index):
+    # CREATE TABLE / CREATE INDEX IF NOT EXISTS run once per process, not once per file
+    if bootstrap in _bootstrapped:
+        return
+    cursor = conn.cursor()
+    bootstrap(cursor)
+    conn.commit()
+    _bootstrapped.add(bootstrap)
+
+atexit.register(close_connection)
+atexit.register(close_pool)
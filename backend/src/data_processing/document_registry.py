@@ -0,0 +1,222 @@
+# rag-pgvector/backend/src/data_processing/document_registry.py
+import hashlib
+import logging
+from config import *
+from db_connection import ensure_schema
+from extraction_cache import calculate_file_hash
+from ingest_pipeline import JST, iter_row_batches, new_stats
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+def create_registry_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS document_registry (
+        file_name TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        page_hashes TEXT[] NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL,
+        chunk_no_start INTEGER,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """)
+    cursor.execute("ALTER TABLE document_registry ADD COLUMN IF NOT EXISTS chunk_no_start INTEGER;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS document_registry_content_hash_idx ON document_registry (content_hash);")
+
+def page_hash(text):
+    return hashlib.md5((text or "").encode('utf-8')).hexdigest()
+
+def get_document(cursor, file_name):
+    cursor.execute(
+        "SELECT content_hash, page_hashes, status, chunk_no_start FROM document_registry WHERE file_name = %s;",
+        (file_name,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {"content_hash": row[0], "page_hashes": list(row[1] or []), "status": row[2], "chunk_no_start": row[3]}
+
+def find_ingested_copy(cursor, content_hash, file_name):
+    cursor.execute("""
+    SELECT file_name, page_hashes FROM document_registry
+    WHERE content_hash = %s AND status = %s AND file_name <> %s
+    LIMIT 1;
+    """, (content_hash, STATUS_COMPLETED, file_name))
+    return cursor.fetchone()
+
+def set_status(cursor, file_name, content_hash, status, page_hashes=None, chunk_no_start=None):
+    # page_hashes describe the rows of the last completed ingest, so they are replaced on completion (or cleared
+    # when they stop describing the stored rows); chunk_no_start (first chunk_no of the current attempt) is kept
+    # until the next attempt sets it
+    if page_hashes is None:
+        cursor.execute("""
+        INSERT INTO document_registry (file_name, content_hash, status, chunk_no_start)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (file_name) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash, status = EXCLUDED.status,
+            chunk_no_start = COALESCE(EXCLUDED.chunk_no_start, document_registry.chunk_no_start), updated_at = now();
+        """, (file_name, content_hash, status, chunk_no_start))
+    else:
+        cursor.execute("""
+        INSERT INTO document_registry (file_name, content_hash, page_hashes, status, chunk_no_start)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (file_name) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash, page_hashes = EXCLUDED.page_hashes, status = EXCLUDED.status,
+            chunk_no_start = COALESCE(EXCLUDED.chunk_no_start, document_registry.chunk_no_start), updated_at = now();
+        """, (file_name, content_hash, page_hashes, status, chunk_no_start))
+
+def promote_duplicates(cursor, where, params):
+    # Near-duplicates keep only a reference to their canonical row. Before canonical rows matching `where` are
+    # deleted, the first surviving duplicate of each takes over its vector and the others are re-pointed to it
+    cursor.execute(f"""
+    WITH doomed AS (
+        SELECT chunk_id, file_name, chunk_no, model, chunk_vector FROM document_vectors WHERE {where}
+    ), refs AS (
+        SELECT r.chunk_id, d.model, d.chunk_vector,
+               row_number() OVER w AS rank,
+               first_value(r.file_name) OVER w AS new_file_name,
+               first_value(r.chunk_no) OVER w AS new_chunk_no
+        FROM doomed d
+        JOIN document_vectors r ON r.duplicate_of_file = d.file_name AND r.duplicate_of_chunk_no = d.chunk_no
+        WHERE d.chunk_vector IS NOT NULL AND r.chunk_id NOT IN (SELECT chunk_id FROM doomed)
+        WINDOW w AS (PARTITION BY d.chunk_id ORDER BY r.file_name, r.chunk_no)
+    )
+    UPDATE document_vectors v
+    SET chunk_vector = CASE WHEN refs.rank = 1 THEN refs.chunk_vector END,
+        model = CASE WHEN refs.rank = 1 THEN refs.model ELSE v.model END,
+        duplicate_of_file = CASE WHEN refs.rank = 1 THEN NULL ELSE refs.new_file_name END,
+        duplicate_of_chunk_no = CASE WHEN refs.rank = 1 THEN NULL ELSE refs.new_chunk_no END
+    FROM refs WHERE v.chunk_id = refs.chunk_id;
+    """, params)
+    if cursor.rowcount:
+        logger.info(f"Re-pointed {cursor.rowcount} near-duplicate rows whose canonical row is being deleted")
+
+def delete_rows(cursor, where, params):
+    promote_duplicates(cursor, where, params)
+    cursor.execute(f"DELETE FROM document_vectors WHERE {where};", params)
+
+def delete_pages(cursor, file_name, pages, before_chunk_no):
+    # Only rows of earlier ingests: rows of the current attempt are upserted, not replaced
+    if pages:
+        delete_rows(cursor, "file_name = %s AND document_page = ANY(%s) AND chunk_no < %s",
+                    (file_name, sorted(pages), before_chunk_no))
+
+def get_stored_chunks(cursor, file_name, chunk_no_start):
+    cursor.execute("""
+    SELECT chunk_no, content_hash, duplicate_of_file, duplicate_of_chunk_no FROM document_vectors
+    WHERE file_name = %s AND chunk_no >= %s;
+    """, (file_name, chunk_no_start))
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+def copy_document_rows(cursor, source_file_name, file_name):
+    delete_rows(cursor, "file_name = %s", (file_name,))
+    cursor.execute("""
+    INSERT INTO document_vectors
+    (file_name, document_page, chunk_no, text, model, prompt_tokens, total_tokens, created_date_time, chunk_vector,
+     duplicate_of_file, duplicate_of_chunk_no, content_hash, document_page_end)
+    SELECT %s, document_page, chunk_no, text, model, prompt_tokens, total_tokens, now(), chunk_vector,
+           duplicate_of_file, duplicate_of_chunk_no, content_hash, document_page_end
+    FROM document_vectors WHERE file_name = %s;
+    """, (file_name, source_file_name))
+    return cursor.rowcount
+
+class PageChanges:
+    # Page filter for the ingest pipeline: records every page hash and lets through only pages
+    # that differ from the last completed ingest
+    def __init__(self, previous_page_hashes):
+        self.previous_page_hashes = previous_page_hashes
+        self.page_hashes = []
+        self.changed_pages = set()
+
+    def __call__(self, page):
+        page_num = page["metadata"]["page"]
+        digest = page_hash(page["page_content"])
+        self.page_hashes.append(digest)
+        if page_num < len(self.previous_page_hashes) and self.previous_page_hashes[page_num] == digest:
+            return False
+        self.changed_pages.add(page_num)
+        return True
+
+def ingest_document(conn, file_path, file_name, insert_batch, content_hash=None, tz=JST):
+    # insert_batch(cursor, rows) writes one batch with the caller's driver
+    content_hash = content_hash or calculate_file_hash(file_path)
+    ensure_schema(conn, create_registry_table)
+    cursor = conn.cursor()
+    previous = get_document(cursor, file_name)
+
+    if previous and previous["status"] == STATUS_COMPLETED and previous["content_hash"] == content_hash:
+        conn.commit()
+        logger.info(f"Skipping {file_name}: unchanged since last ingest")
+        return {"status": "skipped"}
+
+    copy = find_ingested_copy(cursor, content_hash, file_name)
+    if copy:
+        source_file_name, page_hashes = copy
+        row_count = copy_document_rows(cursor, source_file_name, file_name)
+        set_status(cursor, file_name, content_hash, STATUS_COMPLETED, list(page_hashes or []))
+        conn.commit()
+        logger.info(f"Reused {row_count} rows for {file_name}: identical to already ingested {source_file_name}")
+        return {"status": "copied", "chunks": row_count}
+
+    # A retry or redelivery of the same content resumes the interrupted attempt: same chunk numbers, so its
+    # committed rows are recognised by content hash and neither re-embedded nor inserted twice
+    interrupted = previous and previous["status"] != STATUS_COMPLETED and previous["chunk_no_start"] is not None
+    page_hashes = None
+    if interrupted and previous["content_hash"] == content_hash:
+        chunk_no_start = previous["chunk_no_start"]
+        stored_chunks = get_stored_chunks(cursor, file_name, chunk_no_start)
+        logger.info(f"Resuming interrupted ingest of {file_name}: {len(stored_chunks)} chunks already stored")
+    else:
+        if interrupted:
+            # Rows of an interrupted attempt at a different version of the file. That attempt may already have
+            # deleted the earlier rows of the pages it replaced, so no page can be trusted as unchanged any more
+            delete_rows(cursor, "file_name = %s AND chunk_no >= %s", (file_name, previous["chunk_no_start"]))
+            previous["page_hashes"] = []
+            # Persisted too, in case this attempt is interrupted as well
+            page_hashes = []
+        cursor.execute("SELECT COALESCE(MAX(chunk_no) + 1, 0) FROM document_vectors WHERE file_name = %s;", (file_name,))
+        chunk_no_start = cursor.fetchone()[0]
+        stored_chunks = {}
+    set_status(cursor, file_name, content_hash, STATUS_PROCESSING, page_hashes, chunk_no_start=chunk_no_start)
+    conn.commit()
+
+    # Chunks merged across pages can straddle a changed page, so page-level reuse needs CHUNK_MERGE_PAGES off
+    previous_page_hashes = previous["page_hashes"] if previous and not CHUNK_MERGE_PAGES else []
+    changes = PageChanges(previous_page_hashes)
+    stats = new_stats()
+    cleared_pages = set()
+    try:
+        for data in iter_row_batches(file_path, file_name, stats=stats, tz=tz, content_hash=content_hash,
+                                     page_filter=changes, chunk_no_start=chunk_no_start, stored_chunks=stored_chunks):
+            # Rows of a changed page are replaced in the same transaction as its first new batch
+            pages = {row[1] for row in data} - cleared_pages
+            delete_pages(cursor, file_name, pages, chunk_no_start)
+            cleared_pages |= pages
+            insert_batch(cursor, data)
+            conn.commit()
+            logger.info(f"Inserted batch of {len(data)} rows into the database")
+
+        # Changed pages that no longer produce chunks, and pages past the new end of the document
+        delete_pages(cursor, file_name, changes.changed_pages - cleared_pages, chunk_no_start)
+        delete_rows(cursor, "file_name = %s AND document_page >= %s", (file_name, len(changes.page_hashes)))
+        # Stored chunks past the end of this attempt (an interrupted attempt chunked differently)
+        if "chunk_no_end" in stats:
+            delete_rows(cursor, "file_name = %s AND chunk_no >= %s", (file_name, stats["chunk_no_end"]))
+        set_status(cursor, file_name, content_hash, STATUS_COMPLETED, changes.page_hashes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        set_status(cursor, file_name, content_hash, STATUS_FAILED)
+        conn.commit()
+        raise
+
+    # Chunks resumed from an interrupted attempt are part of this ingest, just not written again
+    stats["chunks"] += stats.get("skipped_chunks", 0)
+    unchanged = len(changes.page_hashes) - len(changes.changed_pages)
+    logger.info(f"Processed {file_name}: {stats['pages']} pages ({unchanged} unchanged), {stats['chunks']} chunks")
+    stats.update(status="ingested", unchanged_pages=unchanged)
+    return stats
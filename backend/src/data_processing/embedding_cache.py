@@ -0,0 +1,194 @@
+# rag-pgvector/backend/src/data_processing/embedding_cache.py
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+import numpy as np
+from config import *
+from db_connection import ManagedConnection
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip()
+
+def embedding_cache_key(model, dimensions, text):
+    payload = f"{model}\x00{dimensions or ''}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def pack_vector(embedding):
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+def unpack_vector(blob):
+    return np.frombuffer(bytes(blob), dtype=np.float32)
+
+class DiskEmbeddingCache:
+    def __init__(self, path, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # The ingest pipeline embeds on a worker thread; calls never overlap
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT,
+            embedding BLOB,
+            prompt_tokens INTEGER,
+            total_tokens INTEGER,
+            last_access REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embedding_cache_last_access_idx ON embedding_cache (last_access)")
+        self.conn.commit()
+        logger.info(f"Using on-disk embedding cache: {path}")
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        # SQLite caps the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self.conn.execute(
+                f"SELECT cache_key, model, embedding, prompt_tokens, total_tokens FROM embedding_cache WHERE cache_key IN ({placeholders})",
+                part
+            ).fetchall()
+            for key, model, blob, prompt_tokens, total_tokens in rows:
+                found[key] = {
+                    "embedding": unpack_vector(blob),
+                    "model": model,
+                    "prompt_tokens": prompt_tokens,
+                    "total_tokens": total_tokens
+                }
+
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE embedding_cache SET last_access = ? WHERE cache_key = ?", [(now, key) for key in found])
+            self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (key, result["model"], pack_vector(result["embedding"]), result["prompt_tokens"], result["total_tokens"], now)
+                for key, result in items
+            ]
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM embedding_cache WHERE cache_key IN (SELECT cache_key FROM embedding_cache ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            self.conn.commit()
+            logger.info(f"Evicted {excess} least recently used embeddings from cache")
+
+class PostgresEmbeddingCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Its own connection: cache writes commit independently of the caller's ingest transaction
+        self.db = ManagedConnection("Embedding cache", self.create_table)
+        self.db.get()
+        logger.info("Using Postgres embedding cache table: embedding_cache")
+
+    @staticmethod
+    def create_table(conn):
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT,
+            embedding BYTEA,
+            prompt_tokens INTEGER,
+            total_tokens INTEGER,
+            last_access TIMESTAMPTZ DEFAULT now()
+        );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS embedding_cache_last_access_idx ON embedding_cache (last_access);")
+        conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return found
+
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            UPDATE embedding_cache SET last_access = now()
+            WHERE cache_key = ANY(%s)
+            RETURNING cache_key, model, embedding, prompt_tokens, total_tokens;
+            """, (keys,))
+            for key, model, blob, prompt_tokens, total_tokens in cursor.fetchall():
+                found[key] = {
+                    "embedding": unpack_vector(blob),
+                    "model": model,
+                    "prompt_tokens": prompt_tokens,
+                    "total_tokens": total_tokens
+                }
+            conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+            INSERT INTO embedding_cache (cache_key, model, embedding, prompt_tokens, total_tokens)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (cache_key) DO NOTHING;
+            """, [
+                (key, result["model"], pack_vector(result["embedding"]), result["prompt_tokens"], result["total_tokens"])
+                for key, result in items
+            ])
+            conn.commit()
+        self.evict()
+
+    def evict(self):
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM embedding_cache;")
+            excess = cursor.fetchone()[0] - self.max_entries
+            if excess > 0:
+                cursor.execute("""
+                DELETE FROM embedding_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM embedding_cache ORDER BY last_access LIMIT %s
+                );
+                """, (excess,))
+                logger.info(f"Evicted {excess} least recently used embeddings from cache")
+            conn.commit()
+
+_cache = None
+
+def get_embedding_cache():
+    global _cache
+    if _cache is None:
+        if EMBEDDING_CACHE_BACKEND == "disk":
+            _cache = DiskEmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES)
+        elif EMBEDDING_CACHE_BACKEND == "postgres":
+            _cache = PostgresEmbeddingCache(EMBEDDING_CACHE_MAX_ENTRIES)
+        elif EMBEDDING_CACHE_BACKEND != "none":
+            raise ValueError(f"Unsupported embedding cache backend: {EMBEDDING_CACHE_BACKEND}")
+    return _cache
@@ -0,0 +1,87 @@
+# rag-pgvector/backend/src/data_processing/embedding_parquet.py
+# Intermediate file between vectorizer.py and csv_to_pgvector.py: one Parquet file per PDF,
+# rows in INSERT_QUERY column order, vectors as a fixed-size float32 list (no text round trip)
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import *
+from pgvector_copy import parse_timestamp
+
+PARQUET_SCHEMA = pa.schema([
+    ("file_name", pa.string()),
+    ("document_page", pa.int16()),
+    ("chunk_no", pa.int32()),
+    ("text", pa.string()),
+    ("model", pa.string()),
+    ("prompt_tokens", pa.int32()),
+    ("total_tokens", pa.int32()),
+    ("created_date_time", pa.timestamp("us", tz="UTC")),
+    ("chunk_vector", pa.list_(pa.float32(), EMBEDDING_DIMENSIONS)),
+    ("duplicate_of_file", pa.string()),
+    ("duplicate_of_chunk_no", pa.int32()),
+    ("content_hash", pa.string()),
+    ("document_page_end", pa.int16()),
+])
+VECTOR_COLUMN = PARQUET_SCHEMA.get_field_index("chunk_vector")
+TIMESTAMP_COLUMN = PARQUET_SCHEMA.get_field_index("created_date_time")
+
+def vector_array(vectors):
+    # Near-duplicate rows have no vector: zero-filled values behind a null mask
+    mask = np.array([vector is None for vector in vectors])
+    values = np.zeros((len(vectors), EMBEDDING_DIMENSIONS), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        if vector is not None:
+            values[i] = vector
+    return pa.FixedSizeListArray.from_arrays(
+        pa.array(values.ravel()), EMBEDDING_DIMENSIONS, mask=pa.array(mask) if mask.any() else None
+    )
+
+def record_batch(rows):
+    columns = list(zip(*rows))
+    arrays = []
+    for i, field in enumerate(PARQUET_SCHEMA):
+        if i == VECTOR_COLUMN:
+            arrays.append(vector_array(columns[i]))
+        elif i == TIMESTAMP_COLUMN:
+            arrays.append(pa.array([parse_timestamp(value) for value in columns[i]], type=field.type))
+        else:
+            arrays.append(pa.array(columns[i], type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=PARQUET_SCHEMA)
+
+class ParquetRowWriter:
+    # Each write() becomes one row group, so the reader can stream the file back batch by batch
+    def __init__(self, path):
+        self.writer = pq.ParquetWriter(path, PARQUET_SCHEMA, compression="zstd")
+        self.rows = 0
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_batch(record_batch(rows))
+            self.rows += len(rows)
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def iter_parquet_rows(path, batch_size=None):
+    # Lists of row tuples; vectors are float32 views of the column buffer, never parsed from text
+    parquet_file = pq.ParquetFile(path)
+    vector_type = parquet_file.schema_arrow.field("chunk_vector").type
+    if vector_type.list_size != EMBEDDING_DIMENSIONS:
+        raise ValueError(f"{path} has {vector_type.list_size}-dimensional vectors but EMBEDDING_DIMENSIONS is {EMBEDDING_DIMENSIONS}")
+
+    for batch in parquet_file.iter_batches(batch_size=batch_size or BATCH_SIZE, columns=PARQUET_SCHEMA.names):
+        vectors = batch.column(VECTOR_COLUMN)
+        values = vectors.flatten().to_numpy(zero_copy_only=False).reshape(-1, EMBEDDING_DIMENSIONS)
+        columns = [batch.column(i).to_pylist() if i != VECTOR_COLUMN else None for i in range(batch.num_columns)]
+        if vectors.null_count:
+            valid = iter(values)
+            columns[VECTOR_COLUMN] = [next(valid) if is_valid else None for is_valid in vectors.is_valid().to_pylist()]
+        else:
+            columns[VECTOR_COLUMN] = list(values)
+        yield list(zip(*columns))
@@ -0,0 +1,314 @@
+# rag-pgvector/backend/src/data_processing/embeddings.py
+import asyncio
+import base64
+import hashlib
+import logging
+import time
+import numpy as np
+from config import *
+from embedding_cache import embedding_cache_key, get_embedding_cache
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# text-embedding-3 系のAPI上限（1リクエストあたりの入力数）
+MAX_INPUTS_PER_REQUEST = 2048
+
+# text-embedding-3 系のトークナイザと1入力あたりの上限
+TOKENIZER_ENCODING = "cl100k_base"
+MAX_TOKENS_PER_INPUT = 8191
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encoding = None
+
+def get_encoding():
+    global _encoding, tiktoken
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            # The BPE file is fetched on first use; fall back to estimates if it is unavailable
+            logger.warning(f"tiktoken encoding unavailable, falling back to byte-length estimates: {e}")
+            tiktoken = None
+    return _encoding
+
+def estimate_tokens(text):
+    # Every BPE token covers at least one byte, so the UTF-8 length is a safe upper bound
+    return len(text.encode('utf-8'))
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def is_utf8_continuation(token_bytes):
+    return (token_bytes[0] & 0xC0) == 0x80
+
+def split_tokens_at_characters(token_bytes, max_tokens):
+    # Byte-level BPE splits many CJK characters across tokens; each cut is moved back until the next
+    # piece starts on a character, so no piece decodes to U+FFFD
+    pieces = []
+    start = 0
+    while start < len(token_bytes):
+        end = min(start + max_tokens, len(token_bytes))
+        cut = end
+        while start + 1 < cut < len(token_bytes) and is_utf8_continuation(token_bytes[cut]):
+            cut -= 1
+        if cut < len(token_bytes) and is_utf8_continuation(token_bytes[cut]):
+            cut = end  # No character boundary in the window (max_tokens smaller than one character)
+        pieces.append(b"".join(token_bytes[start:cut]).decode('utf-8', errors='replace'))
+        start = cut
+    return pieces
+
+def split_oversized_text(text, max_tokens=None):
+    max_tokens = min(max_tokens or EMBEDDING_MAX_INPUT_TOKENS, MAX_TOKENS_PER_INPUT)
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return [text]
+        return split_tokens_at_characters(encoding.decode_tokens_bytes(tokens), max_tokens)
+
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    pieces = []
+    piece = []
+    piece_bytes = 0
+    for char in text:
+        char_bytes = len(char.encode('utf-8'))
+        if piece and piece_bytes + char_bytes > max_tokens:
+            pieces.append("".join(piece))
+            piece = []
+            piece_bytes = 0
+        piece.append(char)
+        piece_bytes += char_bytes
+    if piece:
+        pieces.append("".join(piece))
+    return pieces
+
+def split_usage(total, weights):
+    # Distribute a request-level token count over its inputs (largest remainder, sums to total)
+    weight_sum = sum(weights)
+    if weight_sum == 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+    exact = [total * w / weight_sum for w in weights]
+    shares = [int(x) for x in exact]
+    remainder = total - sum(shares)
+    for i in sorted(range(len(exact)), key=lambda i: exact[i] - shares[i], reverse=True)[:remainder]:
+        shares[i] += 1
+    return shares
+
+def decode_embedding(embedding):
+    # encoding_format="base64" returns little-endian float32 bytes; decode without building Python floats
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+    return np.asarray(embedding, dtype=np.float32)
+
+def map_response(texts, response):
+    weights = [count_tokens(text) for text in texts]
+    prompt_tokens = split_usage(response.usage.prompt_tokens, weights)
+    total_tokens = split_usage(response.usage.total_tokens, weights)
+
+    results = [None] * len(texts)
+    for item in response.data:
+        results[item.index] = {
+            "embedding": decode_embedding(item.embedding),
+            "model": response.model,
+            "prompt_tokens": prompt_tokens[item.index],
+            "total_tokens": total_tokens[item.index]
+        }
+
+    if any(result is None for result in results):
+        raise ValueError(f"Embedding response returned {len(response.data)} vectors for {len(texts)} inputs")
+    return results
+
+class OpenAIEmbeddingProvider:
+    # Clients are created on first use so importing this module needs no network or credentials
+    def __init__(self, azure=False):
+        self.azure = azure
+        self.model = AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT if azure else "text-embedding-3-large"
+        self.rate_limited = True
+        self._client = None
+        self._async_client = None
+        self._async_loop = None
+
+    def _create_client(self, asynchronous):
+        from openai import AsyncAzureOpenAI, AsyncOpenAI, AzureOpenAI, OpenAI
+        # Async retries are handled by async_embeddings so that 429s feed back into its concurrency limit
+        options = {"max_retries": 0} if asynchronous else {}
+        if self.azure:
+            client_class = AsyncAzureOpenAI if asynchronous else AzureOpenAI
+            return client_class(
+                azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                api_key=AZURE_OPENAI_API_KEY,
+                api_version=AZURE_OPENAI_API_VERSION,
+                **options
+            )
+        client_class = AsyncOpenAI if asynchronous else OpenAI
+        return client_class(api_key=OPENAI_API_KEY, **options)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._create_client(asynchronous=False)
+        return self._client
+
+    @property
+    def async_client(self):
+        # Its connection pool is bound to the event loop it first ran on, and every asyncio.run() starts a new loop
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = self._create_client(asynchronous=True)
+            self._async_loop = loop
+        return self._async_client
+
+    async def close_async(self):
+        # Called before the loop ends, while the pooled sockets can still be closed cleanly
+        if self._async_client is not None and self._async_loop is asyncio.get_running_loop():
+            await self._async_client.close()
+        self._async_client = None
+        self._async_loop = None
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(
+            input=texts,
+            model=self.model,
+            dimensions=EMBEDDING_DIMENSIONS,
+            encoding_format="base64"
+        )
+        return map_response(texts, response)
+
+    async def embed_async(self, texts):
+        raw_response = await self.async_client.embeddings.with_raw_response.create(
+            input=texts,
+            model=self.model,
+            dimensions=EMBEDDING_DIMENSIONS,
+            encoding_format="base64"
+        )
+        return map_response(texts, raw_response.parse()), raw_response.headers
+
+class LocalEmbeddingProvider:
+    # Deterministic, offline vectors for load testing: same text -> same unit vector
+    def __init__(self, latency_ms=0):
+        self.model = "local-deterministic"
+        self.rate_limited = False
+        self.latency = latency_ms / 1000.0
+
+    def vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIMENSIONS, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def _results(self, texts):
+        return [
+            {
+                "embedding": self.vector(text),
+                "model": self.model,
+                "prompt_tokens": count_tokens(text),
+                "total_tokens": count_tokens(text)
+            }
+            for text in texts
+        ]
+
+    def embed(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._results(texts)
+
+    async def embed_async(self, texts):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._results(texts), {}
+
+_provider = None
+
+def get_embedding_provider():
+    global _provider
+    if _provider is None:
+        provider_name = EMBEDDING_PROVIDER or ("openai" if ENABLE_OPENAI else "azure")
+        if provider_name == "openai":
+            _provider = OpenAIEmbeddingProvider()
+            logger.info("Using OpenAI API for embeddings")
+        elif provider_name == "azure":
+            _provider = OpenAIEmbeddingProvider(azure=True)
+            logger.info("Using Azure OpenAI API for embeddings")
+        elif provider_name == "local":
+            _provider = LocalEmbeddingProvider(LOCAL_EMBEDDING_LATENCY_MS)
+            logger.info(f"Using local deterministic embeddings (latency: {LOCAL_EMBEDDING_LATENCY_MS}ms per request)")
+        else:
+            raise ValueError(f"Unsupported embedding provider: {provider_name}")
+    return _provider
+
+def iter_batches(texts, max_inputs=None, max_tokens=None):
+    max_inputs = min(max_inputs or EMBEDDING_BATCH_SIZE, MAX_INPUTS_PER_REQUEST)
+    max_tokens = max_tokens or EMBEDDING_BATCH_MAX_TOKENS
+
+    batch = []
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if batch and (len(batch) >= max_inputs or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(i)
+        batch_tokens += tokens
+
+    if batch:
+        yield batch
+
+def request_embeddings(texts):
+    if EMBEDDING_ASYNC:
+        from async_embeddings import create_embeddings_async
+        return asyncio.run(create_embeddings_async(texts))
+
+    provider = get_embedding_provider()
+    results = [None] * len(texts)
+    request_count = 0
+    for indices in iter_batches(texts):
+        batch_results = provider.embed([texts[i] for i in indices])
+        for i, result in zip(indices, batch_results):
+            results[i] = result
+        request_count += 1
+
+    logger.info(f"Created {len(texts)} embeddings in {request_count} requests")
+    return results
+
+def create_embeddings(texts):
+    cache = get_embedding_cache()
+    if cache is None:
+        return request_embeddings(texts)
+
+    model = get_embedding_provider().model
+    keys = [embedding_cache_key(model, EMBEDDING_DIMENSIONS, text) for text in texts]
+    cached = cache.get_many(keys)
+    hit_count = len(cached)
+
+    # Identical chunks within a call are embedded only once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in missing:
+            missing[key] = text
+
+    if missing:
+        fresh = request_embeddings(list(missing.values()))
+        fresh_items = list(zip(missing.keys(), fresh))
+        cache.put_many(fresh_items)
+        cached.update(fresh_items)
+
+    logger.info(f"Embedding cache: {hit_count} hits, {len(missing)} embedded for {len(texts)} chunks (total hits: {cache.hits}, misses: {cache.misses})")
+    return [cached[key] for key in keys]
+
+def create_embedding(text):
+    return create_embeddings([text])[0]
+
+def chunk_content_hash(text):
+    # Exact text plus model and dimensions: a stored row with the same hash needs no new embedding
+    payload = f"{get_embedding_provider().model}\x00{EMBEDDING_DIMENSIONS or ''}\x00{text}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
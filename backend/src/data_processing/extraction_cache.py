@@ -0,0 +1,91 @@
+# rag-pgvector/backend/src/data_processing/extraction_cache.py
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from config import *
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def calculate_file_hash(file_path):
+    # Same digest as the S3 downloaders so a hash computed there can be passed straight through
+    hash_md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+class ExtractionCache:
+    # Per-page extracted text stored as one gzip'd JSON list per file content hash.
+    # Chunking settings are applied after the cache, so CHUNK_SIZE/SEPARATOR changes still hit.
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"Using extracted text cache: {directory}")
+
+    def _path(self, content_hash):
+        return os.path.join(self.directory, f"{content_hash}.json.gz")
+
+    def get(self, content_hash):
+        path = self._path(content_hash)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                texts = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable extracted text cache entry {path}: {e}")
+            os.remove(path)
+            return None
+        # mtime doubles as last access time for eviction
+        os.utime(path)
+        return texts
+
+    def put(self, content_hash, texts):
+        # Write to a temp file and rename so a concurrent reader never sees a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(texts, ensure_ascii=False).encode('utf-8'))
+            os.replace(temp_path, self._path(content_hash))
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json.gz'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue  # removed by another process
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} least recently used extracted text entries from cache")
+
+_cache = None
+
+def get_extraction_cache():
+    global _cache
+    if _cache is None and PDF_EXTRACT_CACHE_ENABLED:
+        _cache = ExtractionCache(PDF_EXTRACT_CACHE_DIR, PDF_EXTRACT_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
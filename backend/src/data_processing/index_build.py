@@ -0,0 +1,112 @@
+# rag-pgvector/backend/src/data_processing/index_build.py
+# Deferred index build: load with no vector index, then build it in one pass.
+# Usage (e.g. after a Lambda backfill with DEFERRED_INDEX_BUILD=true): python index_build.py
+import logging
+import threading
+import time
+from config import *
+from db_connection import connect, connection, ensure_schema
+from pgvector_schema import create_table_and_index, drop_vector_indexes, vector_index_query
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+PROGRESS_QUERY = """
+SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+FROM pg_stat_progress_create_index
+WHERE pid = %s;
+"""
+
+def format_progress(row):
+    phase, blocks_done, blocks_total, tuples_done, tuples_total = row
+    if tuples_total:
+        return f"{phase}: {tuples_done}/{tuples_total} tuples ({tuples_done / tuples_total * 100:.1f}%)"
+    if blocks_total:
+        return f"{phase}: {blocks_done}/{blocks_total} blocks ({blocks_done / blocks_total * 100:.1f}%)"
+    return phase
+
+def report_progress(pid, stop, interval):
+    # CREATE INDEX blocks its own session, so progress is read from a second connection
+    try:
+        conn = connect()
+    except Exception as e:
+        logger.warning(f"Index build progress unavailable: {e}")
+        return
+    try:
+        last = None
+        while not stop.wait(interval):
+            cursor = conn.cursor()
+            cursor.execute(PROGRESS_QUERY, (pid,))
+            row = cursor.fetchone()
+            conn.rollback()
+            if row:
+                message = format_progress(row)
+                if message != last:
+                    logger.info(f"Index build progress - {message}")
+                    last = message
+    except Exception as e:
+        logger.warning(f"Index build progress unavailable: {e}")
+    finally:
+        conn.close()
+
+def prepare_bulk_load(conn):
+    # An existing vector index would be maintained row by row during the load
+    if not DEFERRED_INDEX_BUILD:
+        return
+    cursor = conn.cursor()
+    drop_vector_indexes(cursor)
+    conn.commit()
+    logger.info("Dropped vector index for bulk load; it is rebuilt when loading finishes")
+
+def run_index_build(conn, query):
+    # With autocommit on (CREATE INDEX CONCURRENTLY) the settings are session-wide and reset afterwards;
+    # otherwise SET LOCAL ends them with the transaction, so they never leak into the shared connection
+    autocommit = bool(getattr(conn, "autocommit", False))
+    scope = "" if autocommit else "LOCAL "
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_backend_pid();")
+    pid = cursor.fetchone()[0]
+    cursor.execute(f"SET {scope}maintenance_work_mem = '{INDEX_BUILD_MAINTENANCE_WORK_MEM}';")
+    cursor.execute(f"SET {scope}max_parallel_maintenance_workers = {int(INDEX_BUILD_PARALLEL_WORKERS)};")
+    logger.info(
+        f"Building {INDEX_TYPE.upper()} index (maintenance_work_mem={INDEX_BUILD_MAINTENANCE_WORK_MEM}, "
+        f"max_parallel_maintenance_workers={INDEX_BUILD_PARALLEL_WORKERS})"
+    )
+
+    stop = threading.Event()
+    reporter = threading.Thread(target=report_progress, args=(pid, stop, INDEX_BUILD_PROGRESS_INTERVAL), daemon=True)
+    reporter.start()
+    start = time.perf_counter()
+    try:
+        cursor.execute(query)
+        if not autocommit:
+            conn.commit()
+    except Exception:
+        if not autocommit:
+            conn.rollback()
+        raise
+    finally:
+        stop.set()
+        reporter.join()
+        if autocommit:
+            cursor.execute("RESET maintenance_work_mem;")
+            cursor.execute("RESET max_parallel_maintenance_workers;")
+    logger.info(f"{INDEX_TYPE.upper()} index built in {time.perf_counter() - start:.1f}s")
+
+def build_vector_index(conn):
+    query = vector_index_query()
+    if query is not None:
+        run_index_build(conn, query)
+
+def create_table(cursor):
+    # Bootstrap for this entry point: the vector index is left to build_vector_index, which sizes the build
+    return create_table_and_index(cursor, with_index=False)
+
+def finish_bulk_load(conn):
+    if DEFERRED_INDEX_BUILD:
+        build_vector_index(conn)
+
+if __name__ == "__main__":
+    with connection() as conn:
+        ensure_schema(conn, create_table)
+        build_vector_index(conn)
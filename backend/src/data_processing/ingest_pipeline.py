@@ -0,0 +1,181 @@
+# rag-pgvector/backend/src/data_processing/ingest_pipeline.py
+import logging
+import queue
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from config import *
+from pdf_text import iter_pages_from_pdf
+from chunker import get_chunker
+from embeddings import chunk_content_hash, create_embeddings, split_oversized_text
+from near_duplicates import new_near_duplicate_filter
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+JST = ZoneInfo("Asia/Tokyo")
+
+_DONE = object()
+
+NO_EMBEDDING = {"embedding": None, "model": None, "prompt_tokens": 0, "total_tokens": 0}
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+def prefetch(iterable, maxsize=None):
+    # Runs the iterable in a background thread; the bounded queue applies backpressure
+    # so at most `maxsize` items are buffered between two stages
+    items = queue.Queue(maxsize=maxsize or PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_StageError(e))
+        else:
+            put(_DONE)
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Unblocks the producer when the consumer stops early
+        stop.set()
+        worker.join()
+
+def iter_filtered_pages(pages, stats=None, page_filter=None):
+    for page in pages:
+        if stats is not None:
+            stats["pages"] += 1
+        if page_filter is None or page_filter(page):
+            yield page
+
+def iter_page_chunks(pages, stats=None, page_filter=None):
+    # (first page, last page, text); a chunk merged across pages is recorded under its first page
+    for chunk in get_chunker().iter_chunks(iter_filtered_pages(pages, stats, page_filter)):
+        # Chunks over the model's input limit are split instead of failing the file
+        for piece in split_oversized_text(chunk.text):
+            yield chunk.page_start, chunk.page_end, piece
+
+def embedding_group_size():
+    # Each group is embedded as one round of concurrent requests, so in async mode it holds enough
+    # batches for the adaptive limit to reach EMBEDDING_MAX_CONCURRENCY
+    if EMBEDDING_ASYNC:
+        return max(PIPELINE_EMBEDDING_GROUP_SIZE, EMBEDDING_MAX_CONCURRENCY * EMBEDDING_BATCH_SIZE)
+    return PIPELINE_EMBEDDING_GROUP_SIZE
+
+def iter_groups(items, size):
+    group = []
+    for item in items:
+        group.append(item)
+        if len(group) >= size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+def iter_embedded_rows(page_chunks, file_name, tz=JST, chunk_no_start=0, stored_chunks=None, stats=None):
+    # One list of row tuples (INSERT_QUERY column order) per embedding group.
+    # stored_chunks: {chunk_no: (content_hash, duplicate_of_file, duplicate_of_chunk_no)} of rows an
+    # interrupted attempt already committed; matching chunks are neither embedded nor written again
+    stored_chunks = stored_chunks or {}
+    near_duplicates = new_near_duplicate_filter()
+    chunk_no = chunk_no_start
+    skipped = 0
+    for group in iter_groups(page_chunks, embedding_group_size()):
+        numbered = [(chunk_no + i, (page_start, page_end), chunk) for i, (page_start, page_end, chunk) in enumerate(group)]
+        chunk_no += len(group)
+
+        duplicates = {}
+        if near_duplicates is not None:
+            duplicates = near_duplicates.check_many([(file_name, no, chunk) for no, _, chunk in numbered])
+        pending = []
+        for no, pages, chunk in numbered:
+            content_hash = chunk_content_hash(chunk)
+            duplicate_of = duplicates.get(no) or (None, None)
+            if stored_chunks.get(no) == (content_hash, *duplicate_of):
+                skipped += 1
+            else:
+                pending.append((no, pages, chunk, content_hash, duplicate_of))
+        if not pending:
+            continue
+        embeddings = iter(create_embeddings([chunk for no, _, chunk, _, _ in pending if no not in duplicates]))
+
+        rows = []
+        for no, (page_start, page_end), chunk, content_hash, duplicate_of in pending:
+            current_time = datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S %Z')
+            # A near-duplicate reuses the canonical chunk's vector: no API call and no new index entry
+            embedding = next(embeddings) if no not in duplicates else NO_EMBEDDING
+            rows.append((
+                file_name,                    # file_name
+                page_start,                   # document_page
+                no,                           # chunk_no
+                chunk,                        # text
+                embedding['model'],           # model
+                embedding['prompt_tokens'],   # prompt_tokens
+                embedding['total_tokens'],    # total_tokens
+                current_time,                 # created_date_time
+                embedding['embedding'],       # chunk_vector
+                *duplicate_of,                # duplicate_of_file, duplicate_of_chunk_no
+                content_hash,                 # content_hash
+                page_end                      # document_page_end
+            ))
+        yield rows
+
+    if stats is not None:
+        stats["skipped_chunks"] = skipped
+        stats["chunk_no_end"] = chunk_no
+    if skipped:
+        logger.info(f"{file_name}: {skipped} chunks already stored by an interrupted attempt were not embedded again")
+    if near_duplicates is not None and near_duplicates.duplicates:
+        logger.info(f"{file_name}: {near_duplicates.duplicates} near-duplicate chunks reference a canonical chunk instead of being embedded")
+
+def iter_row_batches(file_path, file_name, batch_size=None, stats=None, tz=JST, content_hash=None,
+                     page_filter=None, chunk_no_start=0, strip_boilerplate=None, stored_chunks=None):
+    # pages -> chunks -> embedding groups -> DB batches, with bounded queues between stages
+    # so peak memory depends on the queue sizes, not on the document length
+    batch_size = batch_size or BATCH_SIZE
+    pages = prefetch(iter_pages_from_pdf(file_path, content_hash=content_hash, strip_boilerplate=strip_boilerplate))
+    page_chunks = iter_page_chunks(pages, stats, page_filter)
+    embedded = prefetch(iter_embedded_rows(page_chunks, file_name, tz, chunk_no_start, stored_chunks, stats))
+
+    batch = []
+    for rows in embedded:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                if stats is not None:
+                    stats["chunks"] += len(batch)
+                yield batch
+                batch = []
+    if batch:
+        if stats is not None:
+            stats["chunks"] += len(batch)
+        yield batch
+
+def new_stats():
+    return {"pages": 0, "chunks": 0}
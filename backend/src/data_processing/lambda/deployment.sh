@@ -4,6 +4,7 @@ set -eo pipefail
 
 FUNCTION_NAME="pdf_processor"
 PACKAGE_DIR="lambda_package"
+SHARED_MODULES="../embeddings.py ../async_embeddings.py ../embedding_cache.py ../pgvector_schema.py ../pgvector_copy.py ../vector_adapters.py ../chunker.py ../boilerplate.py ../pdf_text.py ../extraction_cache.py ../near_duplicates.py ../ingest_pipeline.py ../document_registry.py ../db_connection.py"
 VENV_DIR="venv"
 
 log() {
@@ -43,7 +44,7 @@ def get_version(module_name):
     except ImportError:
         return f'Module {module_name} not found'
 
-modules = ['openai', 'langchain_text_splitters', 'dotenv', 'boto3', 'pypdf', 'psycopg2', 'pydantic', 'pydantic_core']
+modules = ['openai', 'dotenv', 'boto3', 'pypdf', 'psycopg2', 'pydantic', 'pydantic_core', 'tiktoken', 'numpy']
 
 print('Python version:', sys.version)
 for module in modules:
@@ -54,6 +55,7 @@ print('All dependencies are present.')
 
 log "Copying Lambda function code..."
 cp lambda_function.py s3_downloader.py pdf_vectorizer.py config.py .env $PACKAGE_DIR/
+cp $SHARED_MODULES $PACKAGE_DIR/
 
 log "Copying installed packages to Lambda package directory..."
 cp -r $VENV_DIR/lib/python3.11/site-packages/* $PACKAGE_DIR/
@@ -15,16 +15,17 @@ def lambda_handler(event, context):
     logger.info(f"Function started at {jst_time}")
     try:
         # S3からPDFをダウンロード
-        local_file_path = process_sqs_message()
+        downloaded = process_sqs_message()
 
-        if not local_file_path:
+        if not downloaded:
             return {
                 'statusCode': 200,
                 'body': json.dumps('No PDF to process')
             }
 
-        # PDFをベクトル化してデータベースに保存
-        process_pdf_and_insert(local_file_path)
+        # PDFをベクトル化してデータベースに保存（ダウンロード時のハッシュで抽出キャッシュを参照、S3キーを文書の識別子とする）
+        local_file_path, file_hash, s3_key = downloaded
+        process_pdf_and_insert(local_file_path, content_hash=file_hash, file_name=s3_key)
 
         # 処理が完了したらファイルを削除
         os.remove(local_file_path)
@@ -32,14 +32,19 @@ def calculate_file_hash(file_path):
             hash_md5.update(chunk)
     return hash_md5.hexdigest()
 
+def local_path_for(s3_key):
+    # キーごとに別のパス: 同じファイル名で別のキーのPDFが残っていても取り違えない
+    key_hash = hashlib.md5(s3_key.encode('utf-8')).hexdigest()[:12]
+    return os.path.join('/tmp', f"{key_hash}_{os.path.basename(s3_key)}")
+
 def process_message(message):
     body = json.loads(message['Body'])
     s3_key = body['Records'][0]['s3']['object']['key']
-    local_file_path = os.path.join('/tmp', os.path.basename(s3_key))
+    local_file_path = local_path_for(s3_key)
 
     if os.path.exists(local_file_path):
         logger.info(f"File {local_file_path} already exists. Skipping download.")
-        return True
+        return calculate_file_hash(local_file_path)
 
     temp_file_path = local_file_path + '.temp'
     try:
@@ -54,12 +59,12 @@ def process_message(message):
 
         os.rename(temp_file_path, local_file_path)
         logger.info(f"Downloaded and verified {s3_key} to {local_file_path}")
-        return True
+        return file_hash
     except Exception as e:
         logger.error(f"Error processing {s3_key}: {e}")
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
-        return False
+        return None
 
 def receive_sqs_message():
     try:
@@ -114,9 +119,12 @@ def process_sqs_message():
 
     receive_count = int(message['Attributes']['ApproximateReceiveCount'])
 
-    if process_message(message):
+    # 成功時は (ローカルパス, ファイルハッシュ, S3キー) を返す
+    file_hash = process_message(message)
+    if file_hash:
         delete_sqs_message(message['ReceiptHandle'])
-        return os.path.join('/tmp', os.path.basename(json.loads(message['Body'])['Records'][0]['s3']['object']['key']))
+        s3_key = json.loads(message['Body'])['Records'][0]['s3']['object']['key']
+        return local_path_for(s3_key), file_hash, s3_key
     else:
         if receive_count >= MAX_RETRIES:
             logger.warning(f"Message failed after {MAX_RETRIES} attempts. Moving to Dead Letter Queue.")
@@ -30,23 +30,80 @@ LOCAL_DOWNLOAD_PATH = os.getenv("LOCAL_DOWNLOAD_PATH")
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 0))
 SEPARATOR = os.getenv("SEPARATOR", "\n\n")
+# ページ境界をまたいでチャンクを結合する（チャンクは開始ページに記録）
+CHUNK_MERGE_PAGES = os.getenv("CHUNK_MERGE_PAGES", "false").lower() == "true"
+# 多くのページに繰り返し出現する行（ヘッダー・フッター・ページ番号等）を埋め込み前に除去する
+STRIP_BOILERPLATE = os.getenv("STRIP_BOILERPLATE", "false").lower() == "true"
+BOILERPLATE_MIN_PAGE_RATIO = float(os.getenv("BOILERPLATE_MIN_PAGE_RATIO", "0.5"))
+BOILERPLATE_SAMPLE_PAGES = int(os.getenv("BOILERPLATE_SAMPLE_PAGES", "50"))
+# 類似チャンクの重複排除 (none / file / corpus)
+NEAR_DUPLICATE_MODE = os.getenv("NEAR_DUPLICATE_MODE", "none").lower()
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+MINHASH_NUM_PERM = int(os.getenv("MINHASH_NUM_PERM", "128"))
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", "16"))
+MINHASH_SHINGLE_SIZE = int(os.getenv("MINHASH_SHINGLE_SIZE", "5"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "1"))
+PDF_EXTRACT_PAGES_PER_TASK = int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "16"))
+# 抽出済みテキストのキャッシュ（ファイル内容のハッシュ単位）
+PDF_EXTRACT_CACHE_ENABLED = os.getenv("PDF_EXTRACT_CACHE_ENABLED", "false").lower() == "true"
+PDF_EXTRACT_CACHE_DIR = os.getenv("PDF_EXTRACT_CACHE_DIR", "/tmp/extracted_text")
+PDF_EXTRACT_CACHE_MAX_MB = int(os.getenv("PDF_EXTRACT_CACHE_MAX_MB", "128"))
 PDF_INPUT_DIR = os.getenv("PDF_INPUT_DIR")
 CSV_OUTPUT_DIR = os.getenv("CSV_OUTPUT_DIR")
 
+# Embedding設定
+# openai / azure / local (未指定の場合は ENABLE_OPENAI に従う)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "").lower()
+LOCAL_EMBEDDING_LATENCY_MS = float(os.getenv("LOCAL_EMBEDDING_LATENCY_MS", "0"))
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "3072"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "300000"))
+EMBEDDING_MAX_INPUT_TOKENS = int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", "8191"))
+EMBEDDING_ASYNC = os.getenv("EMBEDDING_ASYNC", "false").lower() == "true"
+EMBEDDING_RPM_LIMIT = int(os.getenv("EMBEDDING_RPM_LIMIT", "3000"))
+EMBEDDING_TPM_LIMIT = int(os.getenv("EMBEDDING_TPM_LIMIT", "1000000"))
+EMBEDDING_INITIAL_CONCURRENCY = int(os.getenv("EMBEDDING_INITIAL_CONCURRENCY", "4"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "16"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+EMBEDDING_CACHE_BACKEND = os.getenv("EMBEDDING_CACHE_BACKEND", "none").lower()
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "/tmp/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
 # pgvector_db
 PGVECTOR_DB_NAME = os.getenv("PGVECTOR_DB_NAME")
 PGVECTOR_DB_USER = os.getenv("PGVECTOR_DB_USER")
 PGVECTOR_DB_PASSWORD = os.getenv("PGVECTOR_DB_PASSWORD")
 PGVECTOR_DB_HOST = os.getenv("PGVECTOR_DB_HOST", "pgvector_db")
 PGVECTOR_DB_PORT = int(os.getenv("PGVECTOR_DB_PORT", 5432))
+# DB ドライバ (psycopg2 / pg8000)。接続はプロセス内で再利用し、一定時間使われなかった場合のみ生存確認する
+DB_DRIVER = os.getenv("DB_DRIVER", "pg8000").lower()
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_LIVENESS_CHECK_SECONDS = float(os.getenv("DB_LIVENESS_CHECK_SECONDS", "30"))
+# 検索など同時に接続を使う呼び出し元向けに保持しておく接続数の上限
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
 
 # インデックス設定
+# 埋め込みの保存型 (vector: float32 / halfvec: float16)。既存テーブルの変換は migrate_vector_storage.py
+VECTOR_STORAGE_TYPE = os.getenv("VECTOR_STORAGE_TYPE", "vector").lower()
+# hnsw / ivfflat / binary / none
 INDEX_TYPE = os.getenv("INDEX_TYPE", "hnsw").lower()
 HNSW_M = int(os.getenv("HNSW_M", "16"))
 HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "256"))
 HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "200"))
 IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "20"))
 IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "5"))
+# binary: binary_quantize(chunk_vector) の HNSW (Hamming 距離) で top_k × BINARY_RERANK_FACTOR 件を取得し、元のベクトルで再ランク
+BINARY_RERANK_FACTOR = int(os.getenv("BINARY_RERANK_FACTOR", "8"))
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "5"))
+# 一括取り込み時はベクトルインデックスを作らずに読み込み、最後に一度だけ構築する
+DEFERRED_INDEX_BUILD = os.getenv("DEFERRED_INDEX_BUILD", "false").lower() == "true"
+INDEX_BUILD_MAINTENANCE_WORK_MEM = os.getenv("INDEX_BUILD_MAINTENANCE_WORK_MEM", "1GB")
+INDEX_BUILD_PARALLEL_WORKERS = int(os.getenv("INDEX_BUILD_PARALLEL_WORKERS", "2"))
+INDEX_BUILD_PROGRESS_INTERVAL = float(os.getenv("INDEX_BUILD_PROGRESS_INTERVAL", "10"))
 
 # その他の設定
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1000"))
+# document_vectors への書き込み方式 (insert: execute_batch / executemany, copy: COPY ... FORMAT BINARY)
+BULK_LOAD_METHOD = os.getenv("BULK_LOAD_METHOD", "insert").lower()
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+PIPELINE_EMBEDDING_GROUP_SIZE = int(os.getenv("PIPELINE_EMBEDDING_GROUP_SIZE", "1024"))
@@ -7,6 +7,7 @@ FUNCTION_NAME="pdf_processor"
 
 # 作業ディレクトリ
 PACKAGE_DIR="lambda_package"
+SHARED_MODULES="../embeddings.py ../async_embeddings.py ../embedding_cache.py ../pgvector_schema.py ../pgvector_copy.py ../vector_adapters.py ../chunker.py ../boilerplate.py ../pdf_text.py ../extraction_cache.py ../near_duplicates.py ../ingest_pipeline.py ../document_registry.py ../db_connection.py"
 
 # ログ関数
 log() {
@@ -39,28 +40,31 @@ python -c "
 import sys
 sys.path.insert(0, '$PACKAGE_DIR')
 import openai
-import langchain_text_splitters
 import dotenv
 import boto3
 import pypdf
 import psycopg2
 import pydantic
 import pydantic_core
+import tiktoken
+import numpy
 
 print('Python version:', sys.version)
 print('openai version:', openai.__version__)
-print('langchain_text_splitters version:', langchain_text_splitters.__version__)
 print('python-dotenv version:', dotenv.__version__)
 print('boto3 version:', boto3.__version__)
 print('pypdf version:', pypdf.__version__)
 print('psycopg2 version:', psycopg2.__version__)
 print('pydantic version:', pydantic.__version__)
 print('pydantic_core version:', pydantic_core.__version__)
+print('tiktoken version:', tiktoken.__version__)
+print('numpy version:', numpy.__version__)
 print('All dependencies are present.')
 "
 
 log "Copying Lambda function code..."
 cp lambda_function.py s3_downloader.py pdf_vectorizer.py config.py .env $PACKAGE_DIR/
+cp $SHARED_MODULES $PACKAGE_DIR/
 
 log "Creating ZIP archive..."
 (cd $PACKAGE_DIR && zip -r ../$FUNCTION_NAME.zip .)
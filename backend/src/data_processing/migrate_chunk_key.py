@@ -0,0 +1,68 @@
+# rag-pgvector/backend/src/data_processing/migrate_chunk_key.py
+# One-off migration of an existing document_vectors table to the (file_name, chunk_no) unique key the upserts need
+# Usage: python migrate_chunk_key.py
+#
+# 1. delete rows stored twice (redelivered messages), keeping the newest copy
+# 2. move rows with different content under one (file_name, chunk_no) (files that only shared a base name)
+#    to chunk numbers past the end of the file, so no content is lost
+# 3. build the unique index with CREATE INDEX CONCURRENTLY, so ingests and searches keep running
+# Can be re-run: if writers without the upsert added duplicates during step 3, the build fails and is retried.
+import logging
+from config import *
+from db_connection import connection
+from migrate_vector_storage import index_is_valid
+from pgvector_schema import CHUNK_KEY_INDEX, chunk_key_query
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+DELETE_DUPLICATES = """
+DELETE FROM document_vectors a USING document_vectors b
+WHERE a.file_name = b.file_name AND a.chunk_no = b.chunk_no AND a.chunk_id < b.chunk_id
+  AND a.document_page IS NOT DISTINCT FROM b.document_page AND a.text IS NOT DISTINCT FROM b.text;
+"""
+
+RENUMBER_COLLISIONS = """
+WITH ranked AS (
+    SELECT chunk_id, file_name,
+           row_number() OVER (PARTITION BY file_name, chunk_no ORDER BY chunk_id DESC) AS copy_no,
+           MAX(chunk_no) OVER (PARTITION BY file_name) AS max_chunk_no
+    FROM document_vectors
+), moved AS (
+    SELECT chunk_id, max_chunk_no + row_number() OVER (PARTITION BY file_name ORDER BY chunk_id) AS chunk_no
+    FROM ranked WHERE copy_no > 1
+)
+UPDATE document_vectors d SET chunk_no = moved.chunk_no FROM moved WHERE d.chunk_id = moved.chunk_id;
+"""
+
+def run_counted(conn, label, query):
+    cursor = conn.cursor()
+    cursor.execute(query)
+    count = cursor.rowcount
+    conn.commit()
+    logger.info(f"{label}: {count} rows")
+
+def build_chunk_key(conn):
+    conn.commit()
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        if index_is_valid(conn, CHUNK_KEY_INDEX) is False:
+            # Left behind by an interrupted (or duplicate-hit) concurrent build
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {CHUNK_KEY_INDEX};")
+        cursor.execute(chunk_key_query(concurrently=True))
+    finally:
+        conn.autocommit = False
+
+def migrate(conn):
+    if index_is_valid(conn, CHUNK_KEY_INDEX):
+        logger.info(f"{CHUNK_KEY_INDEX} already exists")
+        return
+    run_counted(conn, "Removed duplicate (file_name, chunk_no) rows", DELETE_DUPLICATES)
+    run_counted(conn, "Renumbered rows that shared a (file_name, chunk_no) with different content", RENUMBER_COLLISIONS)
+    build_chunk_key(conn)
+    logger.info(f"Created unique index {CHUNK_KEY_INDEX}")
+
+if __name__ == "__main__":
+    with connection() as conn:
+        migrate(conn)
@@ -0,0 +1,167 @@
+# rag-pgvector/backend/src/data_processing/migrate_vector_storage.py
+# Online conversion of document_vectors.chunk_vector to VECTOR_STORAGE_TYPE (e.g. vector -> halfvec)
+# Usage: VECTOR_STORAGE_TYPE=halfvec python migrate_vector_storage.py [batch_size]
+#
+# 1. add chunk_vector_new plus a trigger that keeps it in sync with concurrent ingests
+# 2. backfill it in chunk_id ranges, one short transaction per batch
+# 3. build the vector index on the new column with CREATE INDEX CONCURRENTLY
+# 4. swap the columns in one brief transaction (the old column takes its index with it)
+# 5. rewrite rows in batches so the dropped column's TOAST data is released, then VACUUM
+# Every step can be re-run after an interruption. Writers configured for the new storage type should
+# be deployed after the swap; until then they fail the schema check instead of writing the wrong type.
+import logging
+import sys
+import time
+from config import *
+from db_connection import connection
+from index_build import run_index_build
+from pgvector_schema import VECTOR_INDEX_NAMES, VECTOR_TYPE, get_vector_column_type, vector_index_query
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+NEW_COLUMN = "chunk_vector_new"
+SYNC_FUNCTION = "document_vectors_sync_chunk_vector_new"
+# DDL waits at most this long for its lock, so it never queues ahead of (and blocks) regular queries
+LOCK_TIMEOUT = "5s"
+LOCK_ATTEMPTS = 20
+
+def run_ddl(conn, statements):
+    for attempt in range(1, LOCK_ATTEMPTS + 1):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}';")
+            for statement in statements:
+                cursor.execute(statement)
+            conn.commit()
+            return
+        except Exception as e:
+            conn.rollback()
+            if "lock timeout" not in str(e) or attempt == LOCK_ATTEMPTS:
+                raise
+            logger.info(f"Waiting for a lock on document_vectors (attempt {attempt}/{LOCK_ATTEMPTS})")
+            time.sleep(attempt)
+
+def chunk_id_ranges(conn, batch_size):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MIN(chunk_id), 0), COALESCE(MAX(chunk_id), -1) FROM document_vectors;")
+    low, high = cursor.fetchone()
+    conn.commit()
+    return [(start, start + batch_size) for start in range(low, high + 1, batch_size)]
+
+def add_new_column(conn):
+    run_ddl(conn, [
+        f"ALTER TABLE document_vectors ADD COLUMN IF NOT EXISTS {NEW_COLUMN} {VECTOR_TYPE};",
+        f"""
+        CREATE OR REPLACE FUNCTION {SYNC_FUNCTION}() RETURNS trigger AS $$
+        BEGIN
+            NEW.{NEW_COLUMN} := NEW.chunk_vector::{VECTOR_TYPE};
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+        """,
+        f"DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON document_vectors;",
+        f"""
+        CREATE TRIGGER {SYNC_FUNCTION} BEFORE INSERT OR UPDATE OF chunk_vector ON document_vectors
+        FOR EACH ROW EXECUTE FUNCTION {SYNC_FUNCTION}();
+        """,
+    ])
+    logger.info(f"Added {NEW_COLUMN} {VECTOR_TYPE} and its sync trigger")
+
+def backfill(conn, batch_size):
+    # Rows written after the trigger exists are already converted; this covers everything before it
+    cursor = conn.cursor()
+    ranges = chunk_id_ranges(conn, batch_size)
+    converted = 0
+    for i, (start, end) in enumerate(ranges, 1):
+        cursor.execute(f"""
+        UPDATE document_vectors SET {NEW_COLUMN} = chunk_vector::{VECTOR_TYPE}
+        WHERE chunk_id >= %s AND chunk_id < %s AND chunk_vector IS NOT NULL AND {NEW_COLUMN} IS NULL;
+        """, (start, end))
+        converted += cursor.rowcount
+        conn.commit()
+        if i % 100 == 0 or i == len(ranges):
+            logger.info(f"Backfill: {i}/{len(ranges)} batches, {converted} rows converted")
+
+def index_is_valid(conn, name):
+    cursor = conn.cursor()
+    cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s);", (name,))
+    row = cursor.fetchone()
+    conn.commit()
+    return None if row is None else row[0]
+
+def new_index_name():
+    return f"{VECTOR_INDEX_NAMES[INDEX_TYPE]}_new" if INDEX_TYPE in VECTOR_INDEX_NAMES else None
+
+def build_new_index(conn):
+    query = vector_index_query(column=NEW_COLUMN, name=new_index_name(), concurrently=True)
+    if query is None:
+        return
+    conn.commit()
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        if index_is_valid(conn, new_index_name()) is False:
+            # Left behind by an interrupted concurrent build
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_index_name()};")
+        run_index_build(conn, query)
+    finally:
+        conn.autocommit = False
+
+def swap_columns(conn):
+    statements = [
+        f"DROP TRIGGER IF EXISTS {SYNC_FUNCTION} ON document_vectors;",
+        # Drops the old column's vector indexes as well
+        "ALTER TABLE document_vectors DROP COLUMN chunk_vector;",
+        f"ALTER TABLE document_vectors RENAME COLUMN {NEW_COLUMN} TO chunk_vector;",
+    ]
+    if new_index_name():
+        statements.append(f"ALTER INDEX IF EXISTS {new_index_name()} RENAME TO {VECTOR_INDEX_NAMES[INDEX_TYPE]};")
+    statements.append(f"DROP FUNCTION IF EXISTS {SYNC_FUNCTION}();")
+    run_ddl(conn, statements)
+    logger.info(f"document_vectors.chunk_vector is now {VECTOR_TYPE}")
+
+def reclaim_space(conn, batch_size):
+    # A dropped column keeps its data until each row is rewritten; the rewritten row stores NULL for it
+    cursor = conn.cursor()
+    ranges = chunk_id_ranges(conn, batch_size)
+    for i, (start, end) in enumerate(ranges, 1):
+        cursor.execute(
+            "UPDATE document_vectors SET chunk_vector = chunk_vector WHERE chunk_id >= %s AND chunk_id < %s;",
+            (start, end)
+        )
+        conn.commit()
+        if i % 100 == 0 or i == len(ranges):
+            logger.info(f"Reclaim: {i}/{len(ranges)} batches rewritten")
+    conn.autocommit = True
+    try:
+        conn.cursor().execute("VACUUM (ANALYZE) document_vectors;")
+    finally:
+        conn.autocommit = False
+    logger.info("Vacuumed document_vectors")
+
+def migrate(conn, batch_size):
+    cursor = conn.cursor()
+    current = get_vector_column_type(cursor, "chunk_vector")
+    pending = get_vector_column_type(cursor, NEW_COLUMN)
+    conn.commit()
+    if current is None:
+        logger.info("document_vectors.chunk_vector does not exist; nothing to migrate")
+        return
+    if current[0] == VECTOR_STORAGE_TYPE and pending is None:
+        logger.info(f"document_vectors.chunk_vector is already {VECTOR_STORAGE_TYPE}")
+        return
+
+    start = time.perf_counter()
+    logger.info(f"Converting document_vectors.chunk_vector from {current[0]} to {VECTOR_TYPE}")
+    add_new_column(conn)
+    backfill(conn, batch_size)
+    build_new_index(conn)
+    swap_columns(conn)
+    reclaim_space(conn, batch_size)
+    logger.info(f"Migration finished in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else BATCH_SIZE
+    with connection() as conn:
+        migrate(conn, batch_size)
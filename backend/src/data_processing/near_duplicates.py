@@ -0,0 +1,198 @@
+# rag-pgvector/backend/src/data_processing/near_duplicates.py
+import hashlib
+import logging
+from collections import defaultdict
+import numpy as np
+from config import *
+from db_connection import ManagedConnection
+from embedding_cache import normalize_text
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# Shingles are hashed in blocks to bound the (permutations x shingles) temporary array
+SHINGLE_BLOCK = 4096
+
+class MinHasher:
+    def __init__(self, num_perm=None, bands=None, shingle_size=None):
+        self.num_perm = num_perm or MINHASH_NUM_PERM
+        self.bands = bands or MINHASH_BANDS
+        self.shingle_size = shingle_size or MINHASH_SHINGLE_SIZE
+        if self.num_perm % self.bands:
+            raise ValueError(f"MINHASH_NUM_PERM ({self.num_perm}) must be a multiple of MINHASH_BANDS ({self.bands})")
+        self.rows = self.num_perm // self.bands
+        # Fixed seed: signatures persisted for the corpus index must be comparable across processes
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits; a must be odd
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(0, np.iinfo(np.uint64).max, size=(self.num_perm, 1), dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self.b = rng.integers(0, np.iinfo(np.uint64).max, size=(self.num_perm, 1), dtype=np.uint64, endpoint=True)
+
+    def shingle_hashes(self, text):
+        # Rolling polynomial hash of character k-grams, computed with numpy instead of per-shingle Python calls
+        codes = np.frombuffer(normalize_text(text).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        k = min(self.shingle_size, len(codes))
+        if k == 0:
+            return np.zeros(1, dtype=np.uint64)
+        count = len(codes) - k + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for j in range(k):
+            hashes = (hashes * np.uint64(1000003) + codes[j:j + count]) & np.uint64(0xFFFFFFFF)
+        return np.unique(hashes)
+
+    def signature(self, text):
+        hashes = self.shingle_hashes(text)
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(hashes), SHINGLE_BLOCK):
+            block = hashes[start:start + SHINGLE_BLOCK][None, :]
+            permuted = (self.a * block + self.b) >> np.uint64(32)
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def band_keys(self, signature):
+        # One signed 64-bit key per band (fits a BIGINT column); the band index is part of the key
+        keys = []
+        for band in range(self.bands):
+            digest = hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                                     digest_size=8, salt=band.to_bytes(8, 'little')).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+def similarity(signature, other):
+    return float(np.mean(signature == other))
+
+class NearDuplicateIndex:
+    # In-memory LSH index for one file
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.buckets = defaultdict(list)
+        self.signatures = {}
+
+    def find(self, signature, keys):
+        best = None
+        best_score = self.threshold
+        for ref in {ref for key in keys for ref in self.buckets.get(key, ())}:
+            score = similarity(signature, self.signatures[ref])
+            if score >= best_score:
+                best, best_score = ref, score
+        return best
+
+    def add(self, ref, signature, keys):
+        self.signatures[ref] = signature
+        for key in keys:
+            self.buckets[key].append(ref)
+
+class PostgresSignatureIndex:
+    # Corpus-wide index: signatures of canonical chunks and their LSH band keys
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.db = ManagedConnection("Signature index", self.create_tables)
+        self.db.get()
+        logger.info("Using corpus-wide near-duplicate index: chunk_signatures")
+
+    @staticmethod
+    def create_tables(conn):
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_signatures (
+            file_name TEXT,
+            chunk_no INTEGER,
+            signature BYTEA,
+            PRIMARY KEY (file_name, chunk_no)
+        );
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chunk_signature_bands (
+            band_key BIGINT,
+            file_name TEXT,
+            chunk_no INTEGER
+        );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS chunk_signature_bands_key_idx ON chunk_signature_bands (band_key);")
+        conn.commit()
+
+    def find(self, signature, keys, file_name):
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            # Joining document_vectors drops signatures whose rows were since replaced or never committed;
+            # the file being ingested is covered by its in-memory index, and its old rows may be replaced
+            cursor.execute("""
+            SELECT DISTINCT s.file_name, s.chunk_no, s.signature
+            FROM chunk_signature_bands b
+            JOIN chunk_signatures s ON s.file_name = b.file_name AND s.chunk_no = b.chunk_no
+            JOIN document_vectors v ON v.file_name = s.file_name AND v.chunk_no = s.chunk_no
+            WHERE b.band_key = ANY(%s) AND v.chunk_vector IS NOT NULL AND s.file_name <> %s;
+            """, (keys, file_name))
+            rows = cursor.fetchall()
+            conn.commit()
+
+        best = None
+        best_score = self.threshold
+        for candidate_file_name, chunk_no, blob in rows:
+            score = similarity(signature, np.frombuffer(bytes(blob), dtype=np.uint32))
+            if score >= best_score:
+                best, best_score = (candidate_file_name, chunk_no), score
+        return best
+
+    def add_many(self, entries):
+        if not entries:
+            return
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            refs = [ref for ref, _, _ in entries]
+            cursor.executemany(
+                "DELETE FROM chunk_signature_bands WHERE file_name = %s AND chunk_no = %s;",
+                refs
+            )
+            cursor.executemany("""
+            INSERT INTO chunk_signatures (file_name, chunk_no, signature) VALUES (%s, %s, %s)
+            ON CONFLICT (file_name, chunk_no) DO UPDATE SET signature = EXCLUDED.signature;
+            """, [(file_name, chunk_no, signature.tobytes()) for (file_name, chunk_no), signature, _ in entries])
+            cursor.executemany(
+                "INSERT INTO chunk_signature_bands (band_key, file_name, chunk_no) VALUES (%s, %s, %s);",
+                [(key, file_name, chunk_no) for (file_name, chunk_no), _, keys in entries for key in keys]
+            )
+            conn.commit()
+
+class NearDuplicateFilter:
+    # Per-document filter: always checks earlier chunks of the same file, and in corpus mode
+    # also the persisted index of every ingested chunk
+    def __init__(self, hasher, threshold, corpus_index=None):
+        self.hasher = hasher
+        self.local = NearDuplicateIndex(threshold)
+        self.corpus_index = corpus_index
+        self.duplicates = 0
+
+    def check_many(self, chunks):
+        # chunks: [(file_name, chunk_no, text)] -> {chunk_no: (canonical_file_name, canonical_chunk_no)}
+        duplicates = {}
+        canonical = []
+        for file_name, chunk_no, text in chunks:
+            signature = self.hasher.signature(text)
+            keys = self.hasher.band_keys(signature)
+            match = self.local.find(signature, keys)
+            if match is None and self.corpus_index is not None:
+                match = self.corpus_index.find(signature, keys, file_name)
+            if match is None:
+                self.local.add((file_name, chunk_no), signature, keys)
+                canonical.append(((file_name, chunk_no), signature, keys))
+            else:
+                duplicates[chunk_no] = match
+        if self.corpus_index is not None:
+            self.corpus_index.add_many(canonical)
+        self.duplicates += len(duplicates)
+        return duplicates
+
+_hasher = None
+_corpus_index = None
+
+def new_near_duplicate_filter():
+    global _hasher, _corpus_index
+    if NEAR_DUPLICATE_MODE == "none":
+        return None
+    if NEAR_DUPLICATE_MODE not in ("file", "corpus"):
+        raise ValueError(f"Unsupported near-duplicate mode: {NEAR_DUPLICATE_MODE}")
+    if _hasher is None:
+        _hasher = MinHasher()
+    if NEAR_DUPLICATE_MODE == "corpus" and _corpus_index is None:
+        _corpus_index = PostgresSignatureIndex(NEAR_DUPLICATE_THRESHOLD)
+    return NearDuplicateFilter(_hasher, NEAR_DUPLICATE_THRESHOLD, _corpus_index)
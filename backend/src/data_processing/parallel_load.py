@@ -0,0 +1,70 @@
+# rag-pgvector/backend/src/data_processing/parallel_load.py
+# Multi-process driver for the batch loaders (pdf_to_pgvector.py, csv_to_pgvector.py).
+# Each worker process owns one database connection and works through its own list of files.
+import logging
+import multiprocessing
+import os
+import time
+from config import *
+from db_connection import connection, ensure_schema
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def assign_files(file_paths, workers):
+    # Largest files first, each to the worker with the fewest bytes so far, so workers finish together
+    queues = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for path in sorted(file_paths, key=os.path.getsize, reverse=True):
+        i = loads.index(min(loads))
+        queues[i].append(path)
+        loads[i] += os.path.getsize(path)
+    return [queue for queue in queues if queue]
+
+def load_file_queue(process_file, file_paths):
+    # Returns (file_path, rows, seconds, error) per file; one failed file does not stop the others
+    results = []
+    with connection() as conn:
+        ensure_schema(conn)
+        for file_path in file_paths:
+            start = time.perf_counter()
+            try:
+                rows = process_file(file_path, conn) or 0
+                results.append((file_path, rows, time.perf_counter() - start, None))
+            except Exception as e:
+                logger.error(f"Error processing {os.path.basename(file_path)}: {e}")
+                results.append((file_path, 0, time.perf_counter() - start, str(e)))
+    return results
+
+def log_summary(results, workers, elapsed):
+    rows = sum(result[1] for result in results)
+    failed = [result for result in results if result[3] is not None]
+    logger.info(
+        f"Loaded {len(results) - len(failed)}/{len(results)} files, {rows} rows in {elapsed:.1f}s with {workers} worker(s) "
+        f"({rows / elapsed if elapsed else 0:.0f} rows/s, {len(results) / elapsed if elapsed else 0:.2f} files/s)"
+    )
+    for file_path, _, _, error in failed:
+        logger.error(f"Failed: {os.path.basename(file_path)}: {error}")
+
+def load_files(file_paths, process_file, workers=None):
+    # process_file(file_path, conn) -> rows written; it must be a module-level function so spawned workers can import it.
+    # Workers are spawned rather than forked: a forked child would share the parent's connection socket
+    workers = max(1, min(workers or LOAD_WORKERS, len(file_paths)))
+    queues = assign_files(file_paths, workers)
+    start = time.perf_counter()
+    if len(queues) <= 1:
+        results = load_file_queue(process_file, queues[0] if queues else [])
+    else:
+        logger.info(f"Loading {len(file_paths)} files with {len(queues)} worker processes")
+        with multiprocessing.get_context("spawn").Pool(len(queues)) as pool:
+            pending = [(queue, pool.apply_async(load_file_queue, (process_file, queue))) for queue in queues]
+            results = []
+            for queue, result in pending:
+                try:
+                    results.extend(result.get())
+                except Exception as e:
+                    # The worker could not connect (or died); none of its files were loaded
+                    logger.error(f"Worker failed: {e}")
+                    results.extend((file_path, 0, 0.0, str(e)) for file_path in queue)
+    log_summary(results, len(queues), time.perf_counter() - start)
+    return results
@@ -0,0 +1,107 @@
+# rag-pgvector/backend/src/data_processing/pdf_text.py
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from config import *
+from extraction_cache import calculate_file_hash, get_extraction_cache
+from chunker import get_chunker
+from boilerplate import BoilerplateStripper
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def extract_page_range(file_path, start, stop):
+    # Runs in a worker process: each worker opens its own reader
+    with open(file_path, 'rb') as file:
+        pdf = PdfReader(file)
+        return [pdf.pages[i].extract_text() for i in range(start, stop)]
+
+def iter_pages_parallel(file_path, page_count, workers):
+    step = max(1, PDF_EXTRACT_PAGES_PER_TASK)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    try:
+        # Spawned, not forked: extraction runs on a pipeline thread while the embedding thread and DB sockets are live
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    except (OSError, NotImplementedError) as e:
+        # e.g. AWS Lambda has no /dev/shm for multiprocessing semaphores
+        logger.warning(f"Process pool unavailable, extracting serially: {e}")
+        return None
+
+    def iter_texts():
+        # Only a bounded window of ranges is in flight; results are yielded in page order
+        with executor:
+            pending = deque()
+            for start, stop in ranges:
+                pending.append(executor.submit(extract_page_range, file_path, start, stop))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    return iter_texts()
+
+def iter_page_texts(file_path, workers=None):
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    with open(file_path, 'rb') as file:
+        pdf = PdfReader(file)
+        page_count = len(pdf.pages)
+        texts = None
+        if workers > 1 and page_count > PDF_EXTRACT_PAGES_PER_TASK:
+            texts = iter_pages_parallel(file_path, page_count, workers)
+        if texts is None:
+            texts = (page.extract_text() for page in pdf.pages)
+        yield from texts
+
+def iter_pages_from_pdf(file_path, workers=None, content_hash=None, strip_boilerplate=None):
+    strip_boilerplate = STRIP_BOILERPLATE if strip_boilerplate is None else strip_boilerplate
+    pages = iter_raw_pages(file_path, workers, content_hash)
+    if strip_boilerplate:
+        # Applied after the extraction cache, which keeps the raw text
+        pages = BoilerplateStripper().iter_pages(pages, file_path)
+    yield from pages
+
+def iter_raw_pages(file_path, workers=None, content_hash=None):
+    cache = get_extraction_cache()
+    if cache is None:
+        texts = iter_page_texts(file_path, workers)
+    else:
+        content_hash = content_hash or calculate_file_hash(file_path)
+        texts = cache.get(content_hash)
+        if texts is not None:
+            logger.info(f"Using cached extracted text for {file_path} ({len(texts)} pages)")
+        else:
+            texts = iter_cached_page_texts(cache, content_hash, file_path, workers)
+
+    for i, text in enumerate(texts):
+        yield {"page_content": text, "metadata": {"page": i}}
+
+def iter_cached_page_texts(cache, content_hash, file_path, workers):
+    # Only the page text is kept for the cache; it is written once the whole file parsed cleanly.
+    # A caller that stops early (a failed embedding or insert) closes the generator: the remaining pages are
+    # extracted then, so the retry still hits the cache
+    texts = []
+    pages = iter_page_texts(file_path, workers)
+    try:
+        for text in pages:
+            texts.append(text)
+            yield text
+    except GeneratorExit:
+        try:
+            texts.extend(pages)
+            cache.put(content_hash, texts)
+        except Exception as e:
+            logger.warning(f"Extracted text of {file_path} not cached: {e}")
+        raise
+    cache.put(content_hash, texts)
+
+def extract_text_from_pdf(file_path, workers=None, content_hash=None, strip_boilerplate=None):
+    try:
+        return list(iter_pages_from_pdf(file_path, workers, content_hash, strip_boilerplate))
+    except Exception as e:
+        logger.error(f"Error extracting text from PDF {file_path}: {str(e)}")
+        return []
+
+def split_text_into_chunks(text):
+    return get_chunker().split_text(text)
@@ -0,0 +1,108 @@
+# rag-pgvector/backend/src/data_processing/pgvector_copy.py
+import io
+import struct
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import numpy as np
+from config import *
+from pgvector_schema import upsert_clause
+
+# COPY ... (FORMAT BINARY): signature, flags, header extension length
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+NULL_FIELD = struct.pack('>i', -1)
+
+POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+# Abbreviations written by the ingest pipeline ('%Y-%m-%d %H:%M:%S %Z')
+TIMEZONE_ABBREVIATIONS = {"JST": ZoneInfo("Asia/Tokyo"), "UTC": timezone.utc}
+
+def encode_text(value):
+    data = str(value).encode('utf-8')
+    return struct.pack('>i', len(data)) + data
+
+def encode_int2(value):
+    return struct.pack('>ih', 2, int(value))
+
+def encode_int4(value):
+    return struct.pack('>ii', 4, int(value))
+
+def parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    text = str(value).strip()
+    stamp, _, abbreviation = text.rpartition(' ')
+    if abbreviation in TIMEZONE_ABBREVIATIONS:
+        return datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S').replace(tzinfo=TIMEZONE_ABBREVIATIONS[abbreviation])
+    return datetime.fromisoformat(text)
+
+def encode_timestamptz(value):
+    # int64 microseconds since 2000-01-01 UTC
+    moment = parse_timestamp(value)
+    if moment.tzinfo is None:
+        raise ValueError(f"Timestamp without time zone: {value}")
+    delta = moment - POSTGRES_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return struct.pack('>iq', 8, micros)
+
+# Element type of chunk_vector in the binary format
+VECTOR_ELEMENT_DTYPE = '>f2' if VECTOR_STORAGE_TYPE == "halfvec" else '>f4'
+
+def encode_vector(value):
+    # pgvector binary format: int16 dim, int16 unused, dim x big-endian float32 (vector) or float16 (halfvec)
+    values = np.asarray(value, dtype=VECTOR_ELEMENT_DTYPE)
+    return struct.pack('>ihh', 4 + values.nbytes, len(values), 0) + values.tobytes()
+
+COPY_COLUMNS = [
+    ("file_name", encode_text),
+    ("document_page", encode_int2),
+    ("chunk_no", encode_int4),
+    ("text", encode_text),
+    ("model", encode_text),
+    ("prompt_tokens", encode_int4),
+    ("total_tokens", encode_int4),
+    ("created_date_time", encode_timestamptz),
+    ("chunk_vector", encode_vector),
+    ("duplicate_of_file", encode_text),
+    ("duplicate_of_chunk_no", encode_int4),
+    ("content_hash", encode_text),
+    ("document_page_end", encode_int2),
+]
+
+# Session-local table the COPY lands in before the upsert into document_vectors
+STAGING_TABLE = "document_vectors_staging"
+
+def copy_column_list():
+    return ", ".join(name for name, _ in COPY_COLUMNS)
+
+def copy_query(table="document_vectors"):
+    return f"COPY {table} ({copy_column_list()}) FROM STDIN (FORMAT BINARY)"
+
+def encode_rows(rows):
+    # Rows are in INSERT_QUERY column order
+    field_count = struct.pack('>h', len(COPY_COLUMNS))
+    encoders = [encoder for _, encoder in COPY_COLUMNS]
+    parts = [COPY_HEADER]
+    for row in rows:
+        parts.append(field_count)
+        for encoder, value in zip(encoders, row):
+            parts.append(NULL_FIELD if value is None else encoder(value))
+    parts.append(COPY_TRAILER)
+    return b''.join(parts)
+
+def copy_rows(cursor, rows, table="document_vectors"):
+    stream = io.BytesIO(encode_rows(rows))
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(copy_query(table), stream)  # psycopg2
+    else:
+        cursor.execute(copy_query(table), stream=stream)  # pg8000
+
+def copy_upsert_rows(cursor, rows, table="document_vectors"):
+    # COPY cannot resolve conflicts, so rows are copied into a temporary table and upserted from there
+    # with the same ON CONFLICT clause as INSERT_QUERY
+    columns = copy_column_list()
+    cursor.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} AS SELECT {columns} FROM {table} WITH NO DATA;"
+    )
+    cursor.execute(f"TRUNCATE {STAGING_TABLE};")
+    copy_rows(cursor, rows, table=STAGING_TABLE)
+    cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {STAGING_TABLE} {upsert_clause(table)};")
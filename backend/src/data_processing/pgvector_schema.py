@@ -0,0 +1,184 @@
+# rag-pgvector/backend/src/data_processing/pgvector_schema.py
+import logging
+from config import *
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+if VECTOR_STORAGE_TYPE not in ("vector", "halfvec"):
+    raise ValueError(f"Unsupported vector storage type: {VECTOR_STORAGE_TYPE}")
+VECTOR_TYPE = f"{VECTOR_STORAGE_TYPE}({EMBEDDING_DIMENSIONS})"
+
+def vector_index_expression(column="chunk_vector"):
+    # hnsw/ivfflat index halfvec: a vector column is cast, a halfvec column is indexed as is.
+    # binary indexes the sign bits (1 bit per dimension, 1/32 of vector).
+    # Queries must order by the same expression to use the index
+    if INDEX_TYPE == "binary":
+        return f"(binary_quantize({column})::bit({EMBEDDING_DIMENSIONS}))"
+    if VECTOR_STORAGE_TYPE == "halfvec":
+        return f"({column})"
+    return f"({column}::halfvec({EMBEDDING_DIMENSIONS}))"
+
+INDEX_EXPRESSION = vector_index_expression()
+VECTOR_INDEX_NAMES = {
+    "hnsw": "hnsw_document_vectors_chunk_vector_idx",
+    "ivfflat": "ivfflat_document_vectors_chunk_vector_idx",
+    "binary": "binary_document_vectors_chunk_vector_idx",
+}
+INDEX_LABELS = {"hnsw": "HNSW", "ivfflat": "IVFFlat", "binary": "Binary-quantized HNSW"}
+
+CHUNK_KEY_INDEX = "document_vectors_file_chunk_key"
+
+# A redelivered or retried batch hits (file_name, chunk_no) again; rows whose content hash, pages and
+# duplicate reference are unchanged are left untouched (no new tuple, no index maintenance)
+def upsert_clause(table="document_vectors"):
+    return f"""
+ON CONFLICT (file_name, chunk_no) DO UPDATE
+SET document_page = EXCLUDED.document_page, text = EXCLUDED.text, model = EXCLUDED.model,
+    prompt_tokens = EXCLUDED.prompt_tokens, total_tokens = EXCLUDED.total_tokens,
+    created_date_time = EXCLUDED.created_date_time, chunk_vector = EXCLUDED.chunk_vector,
+    duplicate_of_file = EXCLUDED.duplicate_of_file, duplicate_of_chunk_no = EXCLUDED.duplicate_of_chunk_no,
+    content_hash = EXCLUDED.content_hash, document_page_end = EXCLUDED.document_page_end
+WHERE ({table}.content_hash, {table}.document_page, {table}.document_page_end,
+       {table}.duplicate_of_file, {table}.duplicate_of_chunk_no)
+      IS DISTINCT FROM
+      (EXCLUDED.content_hash, EXCLUDED.document_page, EXCLUDED.document_page_end,
+       EXCLUDED.duplicate_of_file, EXCLUDED.duplicate_of_chunk_no)
+"""
+
+# Near-duplicate chunks store no vector and point at the canonical chunk instead.
+# document_page is the first page of the chunk and document_page_end the last (they differ when CHUNK_MERGE_PAGES
+# merges across pages)
+def insert_query(table="document_vectors"):
+    return f"""
+INSERT INTO {table}
+(file_name, document_page, chunk_no, text, model, prompt_tokens, total_tokens, created_date_time, chunk_vector,
+ duplicate_of_file, duplicate_of_chunk_no, content_hash, document_page_end)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::{VECTOR_TYPE}, %s, %s, %s, %s)
+{upsert_clause(table)};
+"""
+
+INSERT_QUERY = insert_query()
+
+def get_vector_column_type(cursor, column="chunk_vector"):
+    # (type name, dimensions) of an existing column, or None
+    cursor.execute("""
+    SELECT t.typname, a.atttypmod
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = to_regclass('document_vectors') AND a.attname = %s AND NOT a.attisdropped;
+    """, (column,))
+    return cursor.fetchone()
+
+def check_vector_dimensions(cursor):
+    # CREATE TABLE IF NOT EXISTS keeps an older table as is, so catch a dimension or storage change early
+    row = get_vector_column_type(cursor)
+    if not row:
+        return
+    type_name, dimensions = row
+    if dimensions > 0 and dimensions != EMBEDDING_DIMENSIONS:
+        raise ValueError(
+            f"document_vectors.chunk_vector has {dimensions} dimensions but EMBEDDING_DIMENSIONS is {EMBEDDING_DIMENSIONS}"
+        )
+    if type_name != VECTOR_STORAGE_TYPE:
+        raise ValueError(
+            f"document_vectors.chunk_vector is {type_name} but VECTOR_STORAGE_TYPE is {VECTOR_STORAGE_TYPE}; "
+            f"convert it with migrate_vector_storage.py"
+        )
+
+def create_table_query(table="document_vectors"):
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        chunk_id SERIAL PRIMARY KEY,
+        file_name TEXT,
+        document_page SMALLINT,
+        chunk_no INTEGER,
+        text TEXT,
+        model TEXT,
+        prompt_tokens INTEGER,
+        total_tokens INTEGER,
+        created_date_time TIMESTAMPTZ,
+        chunk_vector {VECTOR_TYPE},
+        duplicate_of_file TEXT,
+        duplicate_of_chunk_no INTEGER,
+        content_hash TEXT,
+        document_page_end SMALLINT
+    );
+    """
+
+def create_table_and_index(cursor, with_index=True):
+    check_vector_dimensions(cursor)
+    cursor.execute(create_table_query())
+    # Tables created before near-duplicate detection, upserts and page spans
+    cursor.execute("""
+    ALTER TABLE document_vectors
+    ADD COLUMN IF NOT EXISTS duplicate_of_file TEXT,
+    ADD COLUMN IF NOT EXISTS duplicate_of_chunk_no INTEGER,
+    ADD COLUMN IF NOT EXISTS content_hash TEXT,
+    ADD COLUMN IF NOT EXISTS document_page_end SMALLINT;
+    """)
+    create_chunk_key(cursor)
+    logger.info("Table created successfully")
+
+    if not with_index:
+        return
+    if DEFERRED_INDEX_BUILD:
+        logger.info("Deferred index build: vector index is built after loading (index_build.py)")
+    else:
+        create_vector_index(cursor)
+
+def chunk_key_query(concurrently=False):
+    concurrently = "CONCURRENTLY " if concurrently else ""
+    return f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS {CHUNK_KEY_INDEX} ON document_vectors (file_name, chunk_no);"
+
+def create_chunk_key(cursor):
+    # Upserts need the (file_name, chunk_no) key. It is only created here on an empty table; an existing table
+    # may hold duplicates and is migrated once with migrate_chunk_key.py, not by every cold start
+    cursor.execute("SELECT to_regclass(%s);", (CHUNK_KEY_INDEX,))
+    if cursor.fetchone()[0] is not None:
+        return
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM document_vectors);")
+    if cursor.fetchone()[0]:
+        raise ValueError(
+            f"document_vectors has no {CHUNK_KEY_INDEX} unique index; create it with migrate_chunk_key.py"
+        )
+    cursor.execute(chunk_key_query())
+
+def vector_index_query(column="chunk_vector", name=None, concurrently=False):
+    # None when INDEX_TYPE is "none"
+    name = name or VECTOR_INDEX_NAMES.get(INDEX_TYPE)
+    concurrently = "CONCURRENTLY " if concurrently else ""
+    expression = vector_index_expression(column)
+    if INDEX_TYPE == "hnsw":
+        return f"""
+        CREATE INDEX {concurrently}IF NOT EXISTS {name} ON document_vectors
+        USING hnsw ({expression} halfvec_ip_ops)
+        WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});
+        """
+    if INDEX_TYPE == "ivfflat":
+        return f"""
+        CREATE INDEX {concurrently}IF NOT EXISTS {name} ON document_vectors
+        USING ivfflat ({expression} halfvec_ip_ops)
+        WITH (lists = {IVFFLAT_LISTS});
+        """
+    if INDEX_TYPE == "binary":
+        return f"""
+        CREATE INDEX {concurrently}IF NOT EXISTS {name} ON document_vectors
+        USING hnsw ({expression} bit_hamming_ops)
+        WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});
+        """
+    if INDEX_TYPE == "none":
+        return None
+    raise ValueError(f"Unsupported index type: {INDEX_TYPE}")
+
+def create_vector_index(cursor):
+    create_index_query = vector_index_query()
+    if create_index_query is None:
+        logger.info("No index created as per configuration")
+        return
+    cursor.execute(create_index_query)
+    logger.info(f"{INDEX_LABELS[INDEX_TYPE]} index created successfully")
+
+def drop_vector_indexes(cursor):
+    for name in VECTOR_INDEX_NAMES.values():
+        cursor.execute(f"DROP INDEX IF EXISTS {name};")
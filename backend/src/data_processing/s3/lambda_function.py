@@ -1,14 +1,14 @@
 import json
 import boto3
-import psycopg2
 from psycopg2.extras import execute_values
 from botocore.exceptions import ClientError
-from pypdf import PdfReader
-from openai import OpenAI, AzureOpenAI
 import tempfile
 import os
-from langchain_text_splitters import CharacterTextSplitter
 from config import *
+from pdf_text import iter_pages_from_pdf, split_text_into_chunks
+from embeddings import create_embeddings, split_oversized_text
+from ingest_pipeline import embedding_group_size, iter_groups, prefetch
+from db_connection import connection, ensure_schema
 
 s3_client = boto3.client('s3',
                         aws_access_key_id=AWS_ACCESS_KEY_ID,
@@ -19,78 +19,69 @@ sqs_client = boto3.client('sqs',
                         aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
                         region_name=AWS_REGION)
 
-if ENABLE_OPENAI:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-else:
-    openai_client = AzureOpenAI(
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_key=AZURE_OPENAI_API_KEY,
-        api_version=AZURE_OPENAI_API_VERSION
-    )
-
-def get_db_connection():
-    return psycopg2.connect(
-        dbname=PGVECTOR_DB_NAME,
-        user=PGVECTOR_DB_USER,
-        password=PGVECTOR_DB_PASSWORD,
-        host=PGVECTOR_DB_HOST,
-        port=PGVECTOR_DB_PORT
-    )
-
-def extract_text_from_pdf(file_path):
-    with open(file_path, 'rb') as file:
-        pdf = PdfReader(file)
-        return [page.extract_text() for page in pdf.pages]
-
-def split_text_into_chunks(text):
-    text_splitter = CharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separator=SEPARATOR
-    )
-    return text_splitter.split_text(text)
-
-def create_embedding(text):
-    if ENABLE_OPENAI:
-        response = openai_client.embeddings.create(
-            input=text,
-            model="text-embedding-3-large"
+def create_vector_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS document_vectors (
+            id SERIAL PRIMARY KEY,
+            file_name TEXT,
+            page_num INTEGER,
+            chunk_no INTEGER,
+            chunk_text TEXT,
+            vector vector({EMBEDDING_DIMENSIONS})
         )
-    else:
-        response = openai_client.embeddings.create(
-            input=text,
-            model=AZURE_OPENAI_EMBEDDINGS_DEPLOYMENT
+    """)
+    create_chunk_key(cursor)
+
+LEGACY_CHUNK_KEY_INDEX = "document_vectors_file_page_chunk_key"
+
+def create_chunk_key(cursor):
+    # A redelivered SQS message inserts the same chunks again; the upsert needs (file_name, page_num, chunk_no) unique.
+    # Created here only on an empty table: an existing table may already hold duplicates
+    cursor.execute("SELECT to_regclass(%s);", (LEGACY_CHUNK_KEY_INDEX,))
+    if cursor.fetchone()[0] is not None:
+        return
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM document_vectors);")
+    if cursor.fetchone()[0]:
+        raise ValueError(
+            f"document_vectors has no {LEGACY_CHUNK_KEY_INDEX} unique index; delete duplicate "
+            f"(file_name, page_num, chunk_no) rows and create it with CREATE UNIQUE INDEX CONCURRENTLY"
         )
-    return response.data[0].embedding
-
-def process_pdf_and_vectorize(file_path, file_name):
-    pages = extract_text_from_pdf(file_path)
-    vectors = []
-    for page_num, page_text in enumerate(pages):
-        chunks = split_text_into_chunks(page_text)
+    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {LEGACY_CHUNK_KEY_INDEX} "
+                   f"ON document_vectors (file_name, page_num, chunk_no);")
+
+def iter_page_chunks(file_path):
+    for page in prefetch(iter_pages_from_pdf(file_path)):
+        page_text = page["page_content"]
+        page_num = page["metadata"]["page"]
+        chunks = [piece for chunk in split_text_into_chunks(page_text) for piece in split_oversized_text(chunk)]
         for chunk_no, chunk in enumerate(chunks):
             if chunk.strip():
-                vector = create_embedding(chunk)
-                vectors.append((file_name, page_num, chunk_no, chunk, vector))
-    return vectors
+                yield page_num, chunk_no, chunk
 
-def insert_vectors_to_db(vectors):
-    with get_db_connection() as conn:
+def process_pdf_and_vectorize(file_path, file_name):
+    # Yields one list of rows per embedding group instead of materialising the whole document
+    for group in iter_groups(iter_page_chunks(file_path), embedding_group_size()):
+        embeddings = create_embeddings([chunk for _, _, chunk in group])
+        yield [
+            (file_name, page_num, chunk_no, chunk, embedding['embedding'])
+            for (page_num, chunk_no, chunk), embedding in zip(group, embeddings)
+        ]
+
+def insert_vectors_to_db(vector_groups):
+    # Reuses the container's connection; the table is only created on the first message.
+    # Upserts, so a redelivered message rewrites its chunks instead of duplicating them
+    with connection() as conn:
+        ensure_schema(conn, create_vector_table)
         with conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS document_vectors (
-                    id SERIAL PRIMARY KEY,
-                    file_name TEXT,
-                    page_num INTEGER,
-                    chunk_no INTEGER,
-                    chunk_text TEXT,
-                    vector vector(3072)
-                )
-            """)
-            execute_values(cur, """
-                INSERT INTO document_vectors (file_name, page_num, chunk_no, chunk_text, vector)
-                VALUES %s
-            """, vectors)
+            for vectors in prefetch(vector_groups):
+                for batch in iter_groups(vectors, BATCH_SIZE):
+                    execute_values(cur, """
+                        INSERT INTO document_vectors (file_name, page_num, chunk_no, chunk_text, vector)
+                        VALUES %s
+                        ON CONFLICT (file_name, page_num, chunk_no) DO UPDATE
+                        SET chunk_text = EXCLUDED.chunk_text, vector = EXCLUDED.vector
+                        WHERE document_vectors.chunk_text IS DISTINCT FROM EXCLUDED.chunk_text
+                    """, batch)
         conn.commit()
 
 def lambda_handler(event, context):
@@ -3,9 +3,9 @@ import os
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine, inspect, text
-import ast
 import logging
 import struct
+from vector_adapters import decode_vector_send, parse_vector
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -81,7 +81,7 @@ def read_vector_data():
         engine = create_engine(get_db_url())
         query = "SELECT * FROM document_vectors"
         df = pd.read_sql(query, engine)
-        df['chunk_vector'] = df['chunk_vector'].apply(ast.literal_eval)
+        df['chunk_vector'] = df['chunk_vector'].apply(parse_vector)
         logger.info(f"データベースから {len(df)} 行のデータを正常に読み込みました。")
         return engine, df
     except Exception as e:
@@ -106,15 +106,19 @@ def log_sample_data(df):
 def verify_vector(engine):
     with engine.connect() as connection:
         query = text("""
-        SELECT chunk_vector::text
+        SELECT chunk_vector::text, vector_send(chunk_vector)
         FROM document_vectors
+        WHERE chunk_vector IS NOT NULL
         LIMIT 1;
         """)
         result = connection.execute(query)
-        db_vector = result.fetchone()[0]
+        db_vector, db_vector_binary = result.fetchone()
 
     logger.info("\n------ データベース内のベクトル形式 ------")
     logger.info(f"データベースから取得したベクトル（最初の10要素）: {db_vector[:100]}...")
+    # vector_send() はバイナリ表現 (bytea) を返すため、テキストの解析なしで float32 に変換できる
+    binary_vector = decode_vector_send(db_vector_binary)
+    logger.info(f"バイナリ形式から復元したベクトル: {binary_vector[:5]} (テキスト形式と一致: {np.array_equal(binary_vector, parse_vector(db_vector))})")
 
 def compare_float_representations(df):
     logger.info("\n------ 浮動小数点数の表現比較 ------")
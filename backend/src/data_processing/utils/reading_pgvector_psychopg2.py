@@ -4,6 +4,7 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from zoneinfo import ZoneInfo
 from datetime import datetime, timezone
+from vector_adapters import register_psycopg2_adapters
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -17,10 +18,13 @@ def get_db_connection():
         'port': os.getenv('PGVECTOR_DB_PORT')
     }
     logger.info(f"Attempting to connect to database with params: {db_params}")
-    return psycopg2.connect(
+    conn = psycopg2.connect(
         **db_params,
         options="-c timezone=Asia/Tokyo",
     )
+    # vector / halfvec を NumPy 配列として受け取る
+    register_psycopg2_adapters(conn)
+    return conn
 
 def get_table_structure(cursor):
     cursor.execute("""
@@ -71,11 +75,11 @@ def log_sample_data(cursor):
                 jst_time = value.astimezone(ZoneInfo("Asia/Tokyo"))
                 logger.info(f"{key}: {type(value).__name__} - {jst_time}")
             elif key == 'chunk_vector':
-                # PostgreSQLのvector型を文字列として処理
-                vector_str = value.strip('[]')  # 前後の括弧を削除
-                vector_list = [float(x) for x in vector_str.split(',')]  # カンマで分割して浮動小数点数のリストに変換
-                vector_sample = vector_list[:2]
-                logger.info(f"{key}: vector({len(vector_list)}) - {vector_sample} (First 2 elements)\n")
+                # 登録済みのアダプタにより float32 の ndarray として取得される
+                if value is None:
+                    logger.info(f"{key}: None (near-duplicate chunk)\n")
+                else:
+                    logger.info(f"{key}: vector({len(value)}) {value.dtype} - {value[:2]} (First 2 elements)\n")
             else:
                 logger.info(f"{key}: {type(value).__name__} - {value}")
     else:
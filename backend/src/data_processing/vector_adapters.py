@@ -0,0 +1,55 @@
+# rag-pgvector/backend/src/data_processing/vector_adapters.py
+import struct
+import numpy as np
+
+# Element type of each pgvector type on the Python side
+VECTOR_DTYPES = {"vector": np.float32, "halfvec": np.float16}
+
+def format_vector(embedding):
+    # pgvector text literal; 9 significant digits round-trip float32 exactly, 5 round-trip float16
+    embedding = np.asarray(embedding)
+    if embedding.dtype != np.float16:
+        embedding = embedding.astype(np.float32, copy=False)
+    values = embedding.tolist()
+    digits = '%.5g' if embedding.dtype == np.float16 else '%.9g'
+    return '[' + ','.join([digits] * len(values)) % tuple(values) + ']'
+
+def parse_vector(value, dtype=np.float32):
+    # '[1,2,3]' -> ndarray, parsed in C instead of literal_eval / float() per element
+    if value is None:
+        return None
+    return np.fromstring(value[1:-1], dtype=dtype, sep=',')
+
+def decode_vector_send(data, dtype=np.float32):
+    # Output of vector_send()/halfvec_send() (bytea): int16 dim, int16 unused, big-endian elements
+    if data is None:
+        return None
+    data = bytes(data)
+    dim, _ = struct.unpack_from('>hh', data)
+    big_endian = np.dtype(dtype).newbyteorder('>')
+    return np.frombuffer(data, dtype=big_endian, count=dim, offset=4).astype(dtype)
+
+def fetch_vector_type_oids(cursor):
+    cursor.execute("SELECT typname, oid FROM pg_type WHERE typname IN ('vector', 'halfvec');")
+    return {typname: oid for typname, oid in cursor.fetchall()}
+
+def register_psycopg2_adapters(conn=None):
+    # Parameters: ndarray -> vector/halfvec literal. Results (needs a connection to look up the
+    # extension's type OIDs): vector -> float32 ndarray, halfvec -> float16 ndarray
+    from psycopg2.extensions import AsIs, new_type, register_adapter, register_type
+    register_adapter(np.ndarray, lambda embedding: AsIs(f"'{format_vector(embedding)}'"))
+    if conn is None:
+        return
+    with conn.cursor() as cursor:
+        oids = fetch_vector_type_oids(cursor)
+    for typname, oid in oids.items():
+        dtype = VECTOR_DTYPES[typname]
+        caster = new_type((oid,), typname.upper(), lambda value, cursor, dtype=dtype: parse_vector(value, dtype))
+        register_type(caster, conn)
+
+def register_pg8000_adapters(conn):
+    conn.register_out_adapter(np.ndarray, format_vector)
+    cursor = conn.cursor()
+    for typname, oid in fetch_vector_type_oids(cursor).items():
+        dtype = VECTOR_DTYPES[typname]
+        conn.register_in_adapter(oid, lambda value, dtype=dtype: parse_vector(value, dtype))
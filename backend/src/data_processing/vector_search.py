@@ -0,0 +1,95 @@
+# rag-pgvector/backend/src/data_processing/vector_search.py
+# Usage: python vector_search.py "query text" [top_k]
+# Top-k search over the vector index; results carry the chunk metadata and score, never the vectors
+import logging
+import sys
+import numpy as np
+from config import *
+from db_connection import pooled_connection
+from embeddings import create_embedding
+from pgvector_schema import INDEX_EXPRESSION, VECTOR_TYPE
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# pgvector rejects a larger hnsw.ef_search
+HNSW_MAX_EF_SEARCH = 1000
+
+RESULT_COLUMNS = ["chunk_id", "file_name", "document_page", "document_page_end", "chunk_no", "text", "score"]
+
+# Candidates come from the bit index by Hamming distance and are reranked by the exact inner product
+# against the stored vectors; only the candidates' vectors are read
+BINARY_SEARCH_QUERY = f"""
+SELECT chunk_id, file_name, document_page, document_page_end, chunk_no, text, -(chunk_vector <#> %s::{VECTOR_TYPE}) AS score
+FROM (
+    SELECT chunk_id, file_name, document_page, document_page_end, chunk_no, text, chunk_vector
+    FROM document_vectors
+    WHERE chunk_vector IS NOT NULL
+    ORDER BY {INDEX_EXPRESSION} <~> binary_quantize(%s::{VECTOR_TYPE})
+    LIMIT %s
+) candidates
+ORDER BY chunk_vector <#> %s::{VECTOR_TYPE}
+LIMIT %s;
+"""
+
+# <#> is the negative inner product (embeddings are unit length, so the score is the cosine similarity)
+SEARCH_QUERY = f"""
+SELECT chunk_id, file_name, document_page, document_page_end, chunk_no, text,
+       -({INDEX_EXPRESSION} <#> %s::halfvec({EMBEDDING_DIMENSIONS})) AS score
+FROM document_vectors
+WHERE chunk_vector IS NOT NULL
+ORDER BY {INDEX_EXPRESSION} <#> %s::halfvec({EMBEDDING_DIMENSIONS})
+LIMIT %s;
+"""
+
+def binary_candidates(top_k):
+    # The over-fetch is capped at what one HNSW scan can return; the rerank still gets at least top_k rows
+    return max(top_k, min(top_k * BINARY_RERANK_FACTOR, HNSW_MAX_EF_SEARCH))
+
+def ef_search(rows):
+    return min(max(HNSW_EF_SEARCH, rows), HNSW_MAX_EF_SEARCH)
+
+def scan_settings(top_k):
+    # SET LOCAL: the settings end with the search's transaction and never leak into the pooled connection
+    settings = []
+    if INDEX_TYPE == "hnsw":
+        # An HNSW scan returns at most ef_search rows
+        settings.append(f"SET LOCAL hnsw.ef_search = {ef_search(top_k)};")
+    elif INDEX_TYPE == "ivfflat":
+        settings.append(f"SET LOCAL ivfflat.probes = {IVFFLAT_PROBES};")
+    elif INDEX_TYPE == "binary":
+        # The over-fetch has to fit in ef_search as well
+        settings.append(f"SET LOCAL hnsw.ef_search = {ef_search(binary_candidates(top_k))};")
+    # The sort over a large table is costed high enough to trigger JIT compilation, which takes longer than the index scan
+    settings.append("SET LOCAL jit = off;")
+    return settings
+
+def search_by_vector(conn, embedding, top_k=None):
+    top_k = top_k or SEARCH_TOP_K
+    query = np.asarray(embedding, dtype=np.float32)
+    cursor = conn.cursor()
+    try:
+        for setting in scan_settings(top_k):
+            cursor.execute(setting)
+        if INDEX_TYPE == "binary":
+            cursor.execute(BINARY_SEARCH_QUERY, (query, query, binary_candidates(top_k), query, top_k))
+        else:
+            cursor.execute(SEARCH_QUERY, (query, query, top_k))
+        rows = cursor.fetchall()
+    finally:
+        # Read-only: ending the transaction is all that is needed
+        conn.rollback()
+    return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+
+def search(query, top_k=None):
+    embedding = create_embedding(query)['embedding']
+    with pooled_connection() as conn:
+        return search_by_vector(conn, embedding, top_k)
+
+if __name__ == "__main__":
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    for result in search(sys.argv[1], top_k):
+        pages = str(result['document_page'])
+        if result['document_page_end'] not in (None, result['document_page']):
+            pages += f"-{result['document_page_end']}"
+        logger.info(f"{result['score']:.4f}  {result['file_name']} p.{pages} #{result['chunk_no']}: {result['text'][:80]!r}")
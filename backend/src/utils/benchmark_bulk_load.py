@@ -0,0 +1,84 @@
+# rag-pgvector/backend/src/utils/benchmark_bulk_load.py
+# Benchmark of the two BULK_LOAD_METHOD write paths into a copy of the document_vectors schema:
+# execute_batch of the upserting INSERT_QUERY vs copy_upsert_rows (binary COPY into a staging table + the same upsert)
+# Usage: python benchmark_bulk_load.py [rows] [batch_size]
+import os
+import sys
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_batch
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from config import *
+from pgvector_schema import create_table_query, insert_query
+from pgvector_copy import copy_upsert_rows, encode_rows
+from vector_adapters import register_psycopg2_adapters
+
+BENCH_TABLE = "bench_document_vectors"
+
+def make_rows(count):
+    rng = np.random.default_rng(0)
+    current_time = datetime.now(ZoneInfo("Asia/Tokyo")).strftime('%Y-%m-%d %H:%M:%S %Z')
+    rows = []
+    for i in range(count):
+        vector = rng.standard_normal(EMBEDDING_DIMENSIONS, dtype=np.float32)
+        rows.append((
+            "benchmark.pdf", i // 10, i, "benchmark chunk text " * 40, "text-embedding-3-large",
+            300, 300, current_time, vector / np.linalg.norm(vector), None, None, f"{i:064x}", i // 10
+        ))
+    return rows
+
+def run(conn, name, rows, batch_size, write):
+    with conn.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {BENCH_TABLE};")
+        conn.commit()
+        start = time.perf_counter()
+        for i in range(0, len(rows), batch_size):
+            write(cursor, rows[i:i + batch_size])
+            conn.commit()
+        elapsed = time.perf_counter() - start
+    print(f"{name:<28} {len(rows) / elapsed:>10.1f} rows/s  ({elapsed:.2f}s)")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else BATCH_SIZE
+    rows = make_rows(count)
+
+    start = time.perf_counter()
+    encode_rows(rows)
+    print(f"binary encoding only: {count / (time.perf_counter() - start):.1f} rows/s")
+
+    register_psycopg2_adapters()
+    conn = psycopg2.connect(
+        dbname=PGVECTOR_DB_NAME,
+        user=PGVECTOR_DB_USER,
+        password=PGVECTOR_DB_PASSWORD,
+        host=PGVECTOR_DB_HOST,
+        port=PGVECTOR_DB_PORT
+    )
+    try:
+        with conn.cursor() as cursor:
+            # Same columns, types and conflict key as document_vectors, no vector index, so only the write path
+            # is measured; the production table is not touched
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE};")
+            cursor.execute(create_table_query(BENCH_TABLE))
+            cursor.execute(f"CREATE UNIQUE INDEX ON {BENCH_TABLE} (file_name, chunk_no);")
+            conn.commit()
+
+        print(f"{count} rows, {EMBEDDING_DIMENSIONS} dimensions, batch size {batch_size}")
+        bench_insert_query = insert_query(BENCH_TABLE)
+        run(conn, "execute_batch (text cast)", rows, batch_size,
+            lambda cursor, data: execute_batch(cursor, bench_insert_query, data))
+        run(conn, "COPY + staging upsert", rows, batch_size,
+            lambda cursor, data: copy_upsert_rows(cursor, data, table=BENCH_TABLE))
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {BENCH_TABLE};")
+            conn.commit()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# rag-pgvector/backend/src/utils/benchmark_chunker.py
+# Micro-benchmark: langchain CharacterTextSplitter per page vs the native Chunker
+# Usage: python benchmark_chunker.py [pdf_path] [repeat]
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+from config import *
+from langchain_text_splitters import CharacterTextSplitter
+from chunker import Chunker
+from pdf_text import extract_text_from_pdf
+
+def langchain_chunks(pages):
+    # The previous split_text_into_chunks: a new splitter for every page
+    chunks = []
+    for page in pages:
+        text_splitter = CharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            separator=SEPARATOR
+        )
+        chunks.extend(chunk for chunk in text_splitter.split_text(page["page_content"]) if chunk.strip())
+    return chunks
+
+def native_chunks(pages, merge_pages):
+    return [chunk.text for chunk in Chunker(merge_pages=merge_pages).iter_chunks(pages)]
+
+def measure(name, func, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = func(pages)
+    elapsed = time.perf_counter() - start
+    lengths = [len(chunk) for chunk in chunks]
+    small = sum(1 for length in lengths if length < CHUNK_SIZE // 4)
+    print(f"{name:<24} {elapsed / repeat / len(pages) * 1e6:>10.1f} us/page  "
+          f"{len(chunks):>6} chunks  avg {sum(lengths) / max(len(lengths), 1):>7.1f} chars  "
+          f"{small:>5} under {CHUNK_SIZE // 4} chars")
+    return chunks
+
+def main():
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PDF_INPUT_DIR, os.listdir(PDF_INPUT_DIR)[0])
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    pages = extract_text_from_pdf(pdf_path)
+    print(f"{pdf_path}: {len(pages)} pages, CHUNK_SIZE={CHUNK_SIZE}, CHUNK_OVERLAP={CHUNK_OVERLAP}, repeat={repeat}")
+
+    expected = measure("langchain (per page)", langchain_chunks, pages, repeat)
+    actual = measure("native", lambda p: native_chunks(p, False), pages, repeat)
+    measure("native (merge pages)", lambda p: native_chunks(p, True), pages, repeat)
+    print(f"native output identical to langchain: {actual == expected}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# rag-pgvector/backend/src/utils/test_async_embeddings.py
+# One failing batch must not leak concurrency slots: the next call has to complete.
+# Usage: python test_async_embeddings.py
+import asyncio
+import os
+import sys
+os.environ.update(EMBEDDING_BATCH_SIZE="1", EMBEDDING_INITIAL_CONCURRENCY="4", EMBEDDING_MAX_RETRIES="0",
+                  EMBEDDING_CACHE_BACKEND="none", EMBEDDING_DIMENSIONS="4")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+import embeddings
+import async_embeddings
+from async_embeddings import concurrency, create_embeddings_async
+
+class FlakyProvider:
+    # Rate-limited like the OpenAI provider, so requests go through the concurrency limiter
+    model = "flaky"
+    rate_limited = True
+
+    async def embed_async(self, texts):
+        await asyncio.sleep(0.05)
+        if texts[0] == "fail":
+            raise ValueError("batch failed")
+        return [{"embedding": [0.5] * 4, "model": self.model, "prompt_tokens": 1, "total_tokens": 1} for _ in texts], {}
+
+def run(texts):
+    return asyncio.run(asyncio.wait_for(create_embeddings_async(texts), timeout=10))
+
+embeddings._provider = FlakyProvider()
+
+for attempt in range(2):
+    try:
+        run(["a", "b", "fail", "c", "d", "e"])
+        raise AssertionError("the failing batch did not raise")
+    except ValueError:
+        pass
+    assert concurrency.in_flight == 0, f"{concurrency.in_flight} slots leaked after a failed call"
+
+results = run(["a", "b", "c", "d", "e", "f"])
+assert len(results) == 6 and all(result is not None for result in results)
+assert concurrency.in_flight == 0
+print("OK: failed batches release their slots and the next call completes")
@@ -0,0 +1,31 @@
+# rag-pgvector/backend/src/utils/test_extraction_cache.py
+# A caller that stops reading pages partway must still leave the extracted text in the cache for the retry.
+# Usage: python test_extraction_cache.py
+import os
+import sys
+import tempfile
+cache_dir = tempfile.mkdtemp()
+os.environ.update(PDF_EXTRACT_CACHE_ENABLED="true", PDF_EXTRACT_CACHE_DIR=cache_dir, PDF_EXTRACT_WORKERS="1")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data_processing'))
+import pdf_text
+from extraction_cache import calculate_file_hash, get_extraction_cache
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'cat_manual.pdf')
+
+expected = list(pdf_text.iter_page_texts(PDF_PATH))
+assert len(expected) > 1, "the sample PDF needs more than one page"
+
+# Abort after the first page, as a failed embedding or insert would
+pages = pdf_text.iter_pages_from_pdf(PDF_PATH, strip_boilerplate=False)
+next(pages)
+pages.close()
+
+assert get_extraction_cache().get(calculate_file_hash(PDF_PATH)) == expected, "aborted extraction was not cached"
+
+def fail(*args, **kwargs):
+    raise AssertionError("the second call extracted the PDF again")
+
+pdf_text.iter_page_texts = fail
+pages = pdf_text.iter_pages_from_pdf(PDF_PATH, strip_boilerplate=False)
+assert [page["page_content"] for page in pages] == expected
+print(f"OK: {len(expected)} pages cached after an aborted read; the next call hit the cache")